@@ -2,32 +2,52 @@ from dotenv import load_dotenv
 from fastapi.responses import RedirectResponse
 from app.core.security import (
     create_access_token,
-    create_refresh_token,
+    decode_access_token,
+    invalidate_cached_user,
     set_jwt_cookie,
     remove_jwt_cookie,
     verify_refresh_token,
 )
+from app.core.refresh_tokens import (
+    issue_refresh_token,
+    revoke_refresh_family,
+    rotate_refresh_token,
+)
+from app.core.revocation import revocation_filter, revoke_token
 from app.schemas.schemas import TokenResponse, TokenResponseGoogle, UserCreate, LoginFrom
 from app.database.tables import User, UserType
+from app.core.rate_limit import limit_credential_requests_per_account
+from app.core.avatars import InvalidAvatar, process_avatar
+from app.core.blobs import AVATAR, replace_blob
+from app.core.static_files import CHUNK_SIZE
+from app.database.database import AsyncSessionLocal
 from app.utils.utils import (
-    verify_password,
+    DUMMY_PASSWORD_HASH,
+    verify_password_async,
     get_user_by_email,
-    hash_password,
+    hash_password_async,
 )
 from fastapi import HTTPException, status, Response, Request
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from authlib.integrations.starlette_client import OAuth
+import asyncio
+import httpx
+import logging
 import os
+import tempfile
 from pathlib import Path
-import uuid
-import imghdr
-import requests
+from typing import BinaryIO, List
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
 
 env_path = Path(__file__).resolve().parent.parent.parent.parent / ".env"
 load_dotenv(dotenv_path=env_path)
 
-AVATAR_FOLDER = Path(__file__).resolve().parent.parent.parent / "static" / "avatars"
-ALLOWED_IMAGE_EXTENSIONS = {"png", "jpg", "jpeg"}
+logger = logging.getLogger(__name__)
+
+GOOGLE_AVATAR_MAX_BYTES = int(os.getenv("GOOGLE_AVATAR_MAX_BYTES", str(5 * 1024 * 1024)))
+GOOGLE_AVATAR_TIMEOUT_SECONDS = float(os.getenv("GOOGLE_AVATAR_TIMEOUT_SECONDS", "5"))
 
 oauth = OAuth()
 oauth.register(
@@ -43,58 +63,67 @@ oauth.register(
 )
 
 def login_via_google(request: Request):
-    print("login_via_google called")
     redirect_uri = os.getenv('GOOGLE_REDIRECT_URI')
-    print(f"Redirect URI: {redirect_uri}")
+    logger.debug("Starting Google login", extra={"redirect_uri": redirect_uri})
     return oauth.google.authorize_redirect(request, redirect_uri)
 
-def validate_and_save_avatar(avatar_url: str):
-    print(f"validate_and_save_avatar called with avatar_url: {avatar_url}")
-    try:
-        response = requests.get(avatar_url)
-        response.raise_for_status()
-
-        file_extension = imghdr.what(None, h=response.content)
-        print(f"File extension: {file_extension}")
-        if file_extension not in ALLOWED_IMAGE_EXTENSIONS:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid image type."
-            )
+class AvatarTooLarge(Exception):
+    pass
 
-        AVATAR_FOLDER.mkdir(parents=True, exist_ok=True)
-        random_hash = uuid.uuid4().hex
-        avatar_filename = f"{random_hash}.{file_extension}"
-        avatar_path = AVATAR_FOLDER / avatar_filename
 
-        with avatar_path.open("wb") as buffer:
-            buffer.write(response.content)
+async def download_avatar(avatar_url: str, destination: BinaryIO):
+    timeout = httpx.Timeout(GOOGLE_AVATAR_TIMEOUT_SECONDS)
+    # httpx only bounds each connect and read; the deadline covers the whole download so
+    # a server trickling bytes cannot keep it alive.
+    async with asyncio.timeout(GOOGLE_AVATAR_TIMEOUT_SECONDS):
+        async with httpx.AsyncClient(timeout=timeout, follow_redirects=True) as client:
+            async with client.stream("GET", avatar_url) as response:
+                response.raise_for_status()
+                content_type = response.headers.get("content-type", "")
+                if not content_type.startswith("image/"):
+                    raise InvalidAvatar(f"content type {content_type!r}")
+                content_length = response.headers.get("content-length")
+                if content_length and int(content_length) > GOOGLE_AVATAR_MAX_BYTES:
+                    raise AvatarTooLarge(f"{content_length} bytes")
+
+                received = 0
+                async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                    received += len(chunk)
+                    if received > GOOGLE_AVATAR_MAX_BYTES:
+                        raise AvatarTooLarge(f"over {GOOGLE_AVATAR_MAX_BYTES} bytes")
+                    destination.write(chunk)
+    destination.seek(0)
 
-        print(f"Avatar saved as: {avatar_filename}")
-        return {"msg": "Avatar saved successfully", "avatar_filename": str(avatar_filename)}
-    except Exception as e:
-        print(f"Error in validate_and_save_avatar: {e}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=str(e)
-        )
 
-async def handle_google_callback(request: Request, db: Session):
-    print("handle_google_callback called")
+async def set_user_avatar(user_id: int, avatar_filename: str, renditions: List[bytes]):
+    async with AsyncSessionLocal() as db:
+        user = await db.get(User, user_id)
+        if user and user.avatar_path != avatar_filename:
+            await replace_blob(db, AVATAR, user.avatar_path, avatar_filename, renditions)
+            user.avatar_path = avatar_filename
+            await db.commit()
+            invalidate_cached_user(user_id)
+
+
+async def attach_google_avatar(user_id: int, avatar_url: str):
+    try:
+        with tempfile.SpooledTemporaryFile(max_size=CHUNK_SIZE * 4) as buffer:
+            await download_avatar(avatar_url, buffer)
+            data = await run_in_threadpool(buffer.read)
+        avatar_filename, renditions = await process_avatar(data)
+        await set_user_avatar(user_id, avatar_filename, renditions)
+        logger.info("Google avatar attached", extra={"user_id": user_id, "avatar": avatar_filename})
+    except (AvatarTooLarge, InvalidAvatar) as e:
+        logger.warning("Google avatar rejected", extra={"user_id": user_id, "reason": str(e)})
+    except Exception:
+        logger.exception("Attaching Google avatar failed", extra={"user_id": user_id})
+
+async def handle_google_callback(request: Request, db: AsyncSession):
     try:
         token = await oauth.google.authorize_access_token(request)
-        print(f"Token: {token}")
         user_info = await oauth.google.userinfo(token=token)
-        print(f"User info: {user_info}")
-
-        avatar_filename = None
-        avatar_url = user_info.get('picture')
-        if avatar_url:
-            result = validate_and_save_avatar(avatar_url)
-            avatar_filename = result['avatar_filename']
 
-        existing_user = db.query(User).filter(User.email == user_info['email']).first()
-        print(f"Existing user: {existing_user}")
+        existing_user = await get_user_by_email(db, user_info['email'])
 
         if existing_user:
             if existing_user.user_type != UserType.google:
@@ -102,71 +131,78 @@ async def handle_google_callback(request: Request, db: Session):
                     status_code=400,
                     detail="Email already registered with a different method"
                 )
-            if avatar_filename and existing_user.avatar_path != avatar_filename:
-                existing_user.avatar_path = avatar_filename
-                db.commit()
         else:
             new_user = User(
                 username=user_info.get('email'),
                 email=user_info.get('email'),
                 user_type=UserType.google,
-                avatar_path=avatar_filename
             )
             db.add(new_user)
-            db.commit()
-            db.refresh(new_user)
+            await db.commit()
+            await db.refresh(new_user)
             
-        user = get_user_by_email(db, user_info.email)
-        access_token = create_access_token(
-            data={"sub": user_info.get('email'), "user_id": user.id}
+        user = await get_user_by_email(db, user_info.email)
+        refresh_token, family_id = await issue_refresh_token(
+            db, user.id, user_info.get('email')
         )
-        refresh_token = create_refresh_token(
-            data={"sub": user_info.get('email'), "user_id": user.id}
+        access_token = create_access_token(
+            data={
+                "sub": user_info.get('email'),
+                "user_id": user.id,
+                "is_admin": bool(user.is_admin),
+                "fam": family_id,
+            }
         )
 
         frontend_url = os.getenv("FRONTEND_URL")
         redirect_url = f"{frontend_url}/auth/callback?access_token={access_token}&refresh_token={refresh_token}"
-        print(f"Redirect URL: {redirect_url}")
-        return RedirectResponse(redirect_url)
+        avatar_url = user_info.get('picture')
+        background = BackgroundTask(attach_google_avatar, user.id, avatar_url) if avatar_url else None
+        return RedirectResponse(redirect_url, background=background)
 
     except HTTPException as e:
-        print(f"HTTPException in handle_google_callback: {e}")
+        logger.info("Google login rejected", extra={"status_code": e.status_code, "detail": e.detail})
         raise e
-    except Exception as e:
-        print(f"Exception in handle_google_callback: {e}")
+    except Exception:
+        logger.exception("Google login failed")
         raise HTTPException(
             status_code=500,
             detail="Google OAuth callback failed"
         )
 
-def login_user(form_data: LoginFrom, db: Session, response: Response):
-    print(f"login_user called with form_data: {form_data}")
-    user = get_user_by_email(db, form_data.email)
-    if not user or not verify_password(form_data.password, user.password_hash):
-        print("Invalid credentials")
+async def login_user(
+    form_data: LoginFrom, db: AsyncSession, response: Response, request: Request
+):
+    await limit_credential_requests_per_account(form_data.email, request)
+    user = await get_user_by_email(db, form_data.email)
+    password_hash = user.password_hash if user and user.password_hash else DUMMY_PASSWORD_HASH
+    password_valid = await verify_password_async(form_data.password, password_hash)
+    if not user or not user.password_hash or not password_valid:
+        logger.info("Invalid credentials", extra={"event": "auth.login_failed"})
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials",
         )
 
+    refresh_token, family_id = await issue_refresh_token(db, user.id, user.email)
     access_token = create_access_token(
-        data={"sub": user.email, "user_id": user.id}
-    )
-    refresh_token = create_refresh_token(
-        data={"sub": user.email, "user_id": user.id}
+        data={
+            "sub": user.email,
+            "user_id": user.id,
+            "is_admin": bool(user.is_admin),
+            "fam": family_id,
+        }
     )
 
-    print(f"Access token: {access_token}, Refresh token: {refresh_token}")
+    logger.info("User logged in", extra={"event": "auth.login", "user_id": user.id})
     return TokenResponse(
         access_token=access_token,
         refresh_token=refresh_token,
         token_type="bearer",
     )
 
-def refresh_access_token(response: Response, refresh_token: str, db: Session):
-    print(f"refresh_access_token called with refresh_token: {refresh_token}")
+async def refresh_access_token(response: Response, refresh_token: str, db: AsyncSession):
     if not refresh_token:
-        print("Refresh token missing")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Refresh token missing",
@@ -174,38 +210,59 @@ def refresh_access_token(response: Response, refresh_token: str, db: Session):
 
     try:
         token_data = verify_refresh_token(refresh_token)
-        print(f"Token data: {token_data}")
     except Exception:
-        print("Invalid refresh token")
+        logger.info("Invalid refresh token", extra={"event": "auth.refresh_failed"})
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid refresh token",
         )
 
+    user = (
+        await db.execute(
+            select(User.email, User.is_admin).where(User.id == token_data["user_id"])
+        )
+    ).first()
+    if not user or user.email != token_data["sub"] or revocation_filter.is_revoked(token_data):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+        )
+
+    refresh_token, family_id = await rotate_refresh_token(db, token_data)
     access_token = create_access_token(
-        data={"sub": token_data["sub"], "user_id": token_data["user_id"]}
+        data={
+            "sub": token_data["sub"],
+            "user_id": token_data["user_id"],
+            "is_admin": bool(user.is_admin),
+            "fam": family_id,
+        }
     )
     set_jwt_cookie(response, access_token, refresh_token)
 
-    print(f"New access token: {access_token}")
     return TokenResponse(
         access_token=access_token,
         refresh_token=refresh_token,
         token_type="bearer",
     )
 
-def logout_user(response: Response, authorization: str):
-    print("logout_user called")
+async def logout_user(response: Response, authorization: str, db: AsyncSession):
+    token_data = None
+    if authorization:
+        try:
+            token_data = decode_access_token(authorization)
+        except HTTPException:
+            # An expired or malformed token has nothing left to revoke; logging out still succeeds.
+            pass
+    if token_data and not revocation_filter.is_revoked(token_data):
+        await revoke_token(db, token_data)
+        if token_data.get("fam"):
+            await revoke_refresh_family(db, token_data["fam"])
     remove_jwt_cookie(response)
     return {"msg": "Successfully logged out"}
 
-def register_new_user(user_data: UserCreate, db: Session):
-    print(f"register_new_user called with user_data: {user_data}")
-    existing_user = (
-        db.query(User).filter(User.email == user_data.email).first()
-    )
+async def register_new_user(user_data: UserCreate, db: AsyncSession):
+    existing_user = await get_user_by_email(db, user_data.email)
     if existing_user:
-        print("Email already registered")
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered",
@@ -213,14 +270,14 @@ def register_new_user(user_data: UserCreate, db: Session):
     new_user = User(
         username=user_data.username,
         email=user_data.email,
-        password_hash=hash_password(user_data.password),
+        password_hash=await hash_password_async(user_data.password),
     )
 
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
 
-    print(f"New user registered: {new_user}")
+    logger.info("User registered", extra={"user_id": new_user.id})
     return UserCreate(
         username=new_user.username,
         email=new_user.email,
@@ -1,44 +1,45 @@
-from app.core.security import get_user_by_token
-from app.utils.utils import check_admin_privileges
+from app.core.reference_cache import category_cache
+from app.core.security import get_admin_by_token
 from app.schemas.schemas import CategoryCreate, CategoryResponse
 from app.database.tables import Category
 from fastapi import HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 
 
-def create_category(
+async def create_category(
     category_data: CategoryCreate,
-    db: Session,
+    db: AsyncSession,
     authorization: str,
 ) -> CategoryResponse:
-    user = get_user_by_token(authorization, db)
-    check_admin_privileges(user)
+    await get_admin_by_token(authorization, db)
     category = Category(
         name=category_data.name, description=category_data.description
     )
     db.add(category)
-    db.commit()
-    db.refresh(category)
+    await category_cache.mark_changed(db)
+    await db.commit()
+    await db.refresh(category)
+    category_cache.expire()
     return CategoryResponse.from_orm(category)
 
 
-def get_all_categories(
-    db: Session, limit: int, offset: int
-) -> list[CategoryResponse]:
-    categories = db.query(Category).offset(offset).limit(limit).all()
-    return [CategoryResponse.from_orm(category) for category in categories]
+async def get_all_categories(
+    db: AsyncSession, limit: int, offset: int
+) -> ORJSONResponse:
+    payloads = (await category_cache.get(db)).payloads
+    return ORJSONResponse(list(payloads[offset:offset + limit]))
 
 
-def update_category(
+async def update_category(
     category_id: int,
     category_data: CategoryCreate,
-    db: Session,
+    db: AsyncSession,
     authorization: str,
 ) -> CategoryResponse:
-    user = get_user_by_token(authorization, db)
-    check_admin_privileges(user)
+    await get_admin_by_token(authorization, db)
 
-    category = db.query(Category).filter(Category.id == category_id).first()
+    category = await db.get(Category, category_id)
     if not category:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -51,37 +52,40 @@ def update_category(
     if category_data.description:
         category.description = category_data.description
 
-    db.commit()
-    db.refresh(category)
+    await category_cache.mark_changed(db)
+    await db.commit()
+    await db.refresh(category)
+    category_cache.expire()
 
     return CategoryResponse.from_orm(category)
 
 
-def delete_category(
+async def delete_category(
     category_id: int,
-    db: Session,
+    db: AsyncSession,
     authorization: str,
 ):
-    user = get_user_by_token(authorization, db)
-    check_admin_privileges(user)
-    category = db.query(Category).filter(Category.id == category_id).first()
+    await get_admin_by_token(authorization, db)
+    category = await db.get(Category, category_id)
     if not category:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Category not found",
         )
 
-    db.delete(category)
-    db.commit()
+    await db.delete(category)
+    await category_cache.mark_changed(db)
+    await db.commit()
+    category_cache.expire()
     
-def get_category_by_id(
-    category_id: int, db: Session
+async def get_category_by_id(
+    category_id: int, db: AsyncSession
 ) -> CategoryResponse:
-    category = db.query(Category).filter(Category.id == category_id).first()
+    category = await category_cache.lookup(db, category_id)
     if not category:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Category not found",
         )
-    return CategoryResponse.from_orm(category)
+    return category
 
@@ -1,6 +1,6 @@
 from typing import List, Optional
-from app.core.security import get_user_by_token
-from app.utils.utils import check_admin_privileges
+from app.core.security import get_admin_by_token, get_user_by_token
+from app.utils.counters import apply_product_counter_changes
 from app.schemas.schemas import (
     OrderCreate,
     OrderProductResponse,
@@ -9,66 +9,91 @@ from app.schemas.schemas import (
 )
 from app.database.tables import Order, Product, order_product_table
 from fastapi import HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 import math
 from typing import Dict, Any
 
+ORDER_COLUMNS = (Order.id, Order.user_id, Order.order_date, Order.status)
 
-def create_order(
+
+async def create_order(
     order_data: OrderCreate,
-    db: Session,
+    db: AsyncSession,
     authorization: str,
 ) -> OrderResponse:
-    user = get_user_by_token(authorization, db)
+    user = await get_user_by_token(authorization, db)
 
     order = Order(
         user_id=user.id,
         status="pending",
     )
     db.add(order)
-    db.commit()
-    db.refresh(order)
+    await db.commit()
+    await db.refresh(order)
 
     for product_data in order_data.products:
 
-        product = (
-            db.query(Product)
-            .filter(Product.id == product_data.product_id)
-            .first()
-        )
-        if not product:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Product not found",
+        # Conditional decrement, so concurrent orders can neither oversell nor overwrite
+        # each other's stock changes.
+        result = await db.execute(
+            update(Product)
+            .where(
+                Product.id == product_data.product_id,
+                Product.quantity >= product_data.quantity,
             )
-
-        if product.quantity < product_data.quantity:
+            .values(quantity=Product.quantity - product_data.quantity)
+            .execution_options(synchronize_session=False)
+        )
+        if not result.rowcount:
+            product = await db.get(Product, product_data.product_id, populate_existing=True)
+            if not product:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Product not found",
+                )
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Not enough quantity for product {product.name}. Available: {product.quantity}, requested: {product_data.quantity}",
             )
 
-        product.quantity -= product_data.quantity
-        db.commit()
+        # The row stays locked until commit, so this is the quantity the update left.
+        after = (
+            await db.execute(
+                select(Product.category_id, Product.supplier_id, Product.quantity)
+                .where(Product.id == product_data.product_id)
+            )
+        ).one()
+        category_id, supplier_id, quantity = after
+        changed_caches = await apply_product_counter_changes(
+            db,
+            before=(category_id, supplier_id, quantity + product_data.quantity),
+            after=(category_id, supplier_id, quantity),
+        )
+        await db.commit()
+        for cache in changed_caches:
+            cache.expire()
 
-        db.execute(
+        await db.execute(
             order_product_table.insert().values(
                 order_id=order.id,
-                product_id=product.id,
+                product_id=product_data.product_id,
                 quantity=product_data.quantity,
             )
         )
 
-    db.commit()
+    await db.commit()
 
     products_in_order = (
-        db.query(Product)
-        .join(
-            order_product_table, Product.id == order_product_table.c.product_id
+        await db.scalars(
+            select(Product)
+            .join(
+                order_product_table, Product.id == order_product_table.c.product_id
+            )
+            .where(order_product_table.c.order_id == order.id)
         )
-        .filter(order_product_table.c.order_id == order.id)
-        .all()
-    )
+    ).all()
 
     product_responses = [
         OrderProductResponse(product_id=p.id, quantity=p.quantity)
@@ -83,109 +108,88 @@ def create_order(
         products=product_responses,
     )
 
-def get_orders_by_user(
-    db: Session, authorization: str, limit: int, offset: int, status: Optional[str] = None
-) -> Dict[str, Any]:
-    user = get_user_by_token(authorization, db)
+async def serialize_orders(db: AsyncSession, order_rows) -> List[Dict[str, Any]]:
+    orders = [
+        {
+            "id": row.id,
+            "user_id": row.user_id,
+            "order_date": row.order_date.isoformat(),
+            "status": row.status,
+            "products": [],
+        }
+        for row in order_rows
+    ]
+    if not orders:
+        return orders
+
+    orders_by_id = {order["id"]: order for order in orders}
+    order_lines = await db.execute(
+        select(
+            order_product_table.c.order_id,
+            order_product_table.c.product_id,
+            order_product_table.c.quantity,
+        ).where(order_product_table.c.order_id.in_(orders_by_id))
+    )
+    for order_id, product_id, quantity in order_lines:
+        orders_by_id[order_id]["products"].append(
+            {"product_id": product_id, "quantity": quantity, "status": None}
+        )
+    return orders
+
 
-    query = db.query(Order).filter(Order.user_id == user.id)
+async def get_orders_by_user(
+    db: AsyncSession, authorization: str, limit: int, offset: int, status: Optional[str] = None
+) -> ORJSONResponse:
+    user = await get_user_by_token(authorization, db)
+
+    query = select(*ORDER_COLUMNS).where(Order.user_id == user.id)
 
     if status:
-        query = query.filter(Order.status == status)
+        query = query.where(Order.status == status)
 
-    total_orders = query.count()
+    total_orders = await db.scalar(
+        select(func.count()).select_from(query.subquery())
+    )
 
     total_pages = math.ceil(total_orders / limit)
 
     current_page = (offset // limit) + 1
 
-    orders = query.offset(offset).limit(limit).all()
-
-    order_responses = []
-    for order in orders:
-        order_date_str = order.order_date.isoformat()
-
-        products_with_quantity = (
-            db.query(Product, order_product_table.c.quantity)
-            .join(order_product_table, Product.id == order_product_table.c.product_id)
-            .filter(order_product_table.c.order_id == order.id)
-            .all()
-        )
+    orders = (
+        await db.execute(query.order_by(Order.id).offset(offset).limit(limit))
+    ).all()
 
-        product_responses = [
-            OrderProductResponse(product_id=product.id, quantity=quantity)
-            for product, quantity in products_with_quantity
-        ]
-
-        order_responses.append(
-            OrderResponse(
-                id=order.id,
-                user_id=order.user_id,
-                order_date=order_date_str,
-                status=order.status,
-                products=product_responses,
-            )
-        )
-
-    return {
+    return ORJSONResponse({
         "current_page": current_page,
         "total_pages": total_pages,
-        "orders": order_responses,
-    }
-
+        "orders": await serialize_orders(db, orders),
+    })
 
 
-def get_all_orders(
-    db: Session, authorization: str, limit: int, offset: int
-) -> List[OrderResponse]:
-    user = get_user_by_token(authorization, db)
-    check_admin_privileges(user)
 
-    orders_query = db.query(Order).offset(offset).limit(limit)
-    orders = orders_query.all()
-
-    order_responses = []
-    for order in orders:
-        order_date_str = order.order_date.isoformat()
-
-        products_with_quantity = (
-            db.query(Product, order_product_table.c.quantity)
-            .join(
-                order_product_table,
-                Product.id == order_product_table.c.product_id,
-            )
-            .filter(order_product_table.c.order_id == order.id)
-            .all()
-        )
+async def get_all_orders(
+    db: AsyncSession, authorization: str, limit: int, offset: int
+) -> ORJSONResponse:
+    await get_admin_by_token(authorization, db)
 
-        product_responses = [
-            OrderProductResponse(product_id=product.id, quantity=quantity)
-            for product, quantity in products_with_quantity
-        ]
-
-        order_responses.append(
-            OrderResponse(
-                id=order.id,
-                user_id=order.user_id,
-                order_date=order_date_str,
-                status=order.status,
-                products=product_responses,
-            )
+    orders = (
+        await db.execute(
+            select(*ORDER_COLUMNS).order_by(Order.id).offset(offset).limit(limit)
         )
+    ).all()
 
-    return order_responses
+    return ORJSONResponse(await serialize_orders(db, orders))
 
 
-def update_order(
+async def update_order(
     order_id: int,
     order_data: OrderUpdate,
-    db: Session,
+    db: AsyncSession,
     authorization: str,
 ) -> OrderResponse:
-    user = get_user_by_token(authorization, db)
-    check_admin_privileges(user)
+    await get_admin_by_token(authorization, db)
 
-    order = db.query(Order).filter(Order.id == order_id).first()
+    order = await db.get(Order, order_id)
     if not order:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -195,20 +199,21 @@ def update_order(
     if order_data.status is not None:
         order.status = order_data.status
 
-    db.commit()
-    db.refresh(order)
+    await db.commit()
+    await db.refresh(order)
 
     order_date_str = order.order_date.isoformat()
 
     products = (
-        db.query(Product)
-        .join(
-            order_product_table,
-            Product.id == order_product_table.c.product_id,
+        await db.scalars(
+            select(Product)
+            .join(
+                order_product_table,
+                Product.id == order_product_table.c.product_id,
+            )
+            .where(order_product_table.c.order_id == order.id)
         )
-        .filter(order_product_table.c.order_id == order.id)
-        .all()
-    )
+    ).all()
     product_responses = [
         OrderProductResponse(product_id=p.id, quantity=p.quantity)
         for p in products
@@ -223,19 +228,18 @@ def update_order(
     )
 
 
-def delete_order(
+async def delete_order(
     order_id: int,
-    db: Session,
+    db: AsyncSession,
     authorization: str,
 ):
-    user = get_user_by_token(authorization, db)
-    check_admin_privileges(user)
-    order = db.query(Order).filter(Order.id == order_id).first()
+    await get_admin_by_token(authorization, db)
+    order = await db.get(Order, order_id)
     if not order:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Order not found",
         )
 
-    db.delete(order)
-    db.commit()
+    await db.delete(order)
+    await db.commit()
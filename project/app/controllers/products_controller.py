@@ -1,33 +1,45 @@
-import os
-import shutil
-from app.core.security import get_user_by_token
-from app.utils.utils import check_admin_privileges
+from app.core.security import get_admin_by_token
+from app.utils.counters import apply_product_counter_changes, product_state
+from app.core.blobs import PHOTO, acquire_blob, release_blob
+from app.utils.images import render_product_photo
+from app.utils.product_fields import (
+    parse_product_expand,
+    parse_product_fields,
+    product_columns,
+    serialize_products,
+)
 from app.schemas.schemas import ProductCreate, ProductResponse, ProductUpdate
 from app.database.tables import Product
+from typing import Optional
 from fastapi import HTTPException, UploadFile, status
-from sqlalchemy.orm import Session
-import hashlib
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse
+from PIL import Image, UnidentifiedImageError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-def hash_filename(name: str) -> str:
-    return hashlib.sha256(name.encode()).hexdigest()
+MAX_PRODUCTS_PER_REQUEST = 100
 
-def create_product(
+async def create_product(
     product_data: ProductCreate,
-    db: Session,
+    db: AsyncSession,
     authorization: str,
     photo: UploadFile = None,
 ) -> ProductResponse:
-    user = get_user_by_token(authorization, db)
-    check_admin_privileges(user)
+    await get_admin_by_token(authorization, db)
 
     if photo:
-        hashed_name = hash_filename(product_data.name)
-        photo_path = f"static/images/{hashed_name}.png"
-        os.makedirs(os.path.dirname(photo_path), exist_ok=True)
-        with open(photo_path, "wb") as buffer:
-            shutil.copyfileobj(photo.file, buffer)
+        try:
+            photo_path, photo_files, placeholder = await run_in_threadpool(
+                render_product_photo, await photo.read()
+            )
+        except (UnidentifiedImageError, Image.DecompressionBombError):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Photo is not a valid image"
+            )
     else:
-        photo_path = None
+        photo_path, photo_files, placeholder = None, None, None
 
     product = Product(
         name=product_data.name,
@@ -37,33 +49,37 @@ def create_product(
         supplier_id=product_data.supplier_id,
         quantity=product_data.quantity,
         photo_path=photo_path,
+        placeholder=placeholder,
     )
     db.add(product)
-    db.commit()
-    db.refresh(product)
+    await acquire_blob(db, PHOTO, photo_path, photo_files)
+    changed_caches = await apply_product_counter_changes(db, after=product_state(product))
+    await db.commit()
+    await db.refresh(product)
+    for cache in changed_caches:
+        cache.expire()
     return ProductResponse.from_orm(product)
 
-def update_product(
+async def update_product(
     product_id: int,
     product_data: ProductUpdate,
-    db: Session,
+    db: AsyncSession,
     authorization: str,
 ) -> ProductResponse:
-    user = get_user_by_token(authorization, db)
-    check_admin_privileges(user)
+    await get_admin_by_token(authorization, db)
 
-    product = db.query(Product).filter(Product.id == product_id).first()
+    # Locked so orders placed meanwhile cannot change the stock this update's counter
+    # changes are computed from.
+    product = await db.get(Product, product_id, with_for_update=True, populate_existing=True)
     if not product:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Product not found",
         )
+    before = product_state(product)
 
     if product_data.name is not None:
         product.name = product_data.name
-        # Update the hashed filename if the name has changed
-        hashed_name = hash_filename(product_data.name)
-        product.photo_path = f"static/images/{hashed_name}.png"
 
     if product_data.description is not None:
         product.description = product_data.description
@@ -74,37 +90,104 @@ def update_product(
     if product_data.category_id is not None:
         product.category_id = product_data.category_id
 
-    db.commit()
-    db.refresh(product)
+    if product_data.supplier_id is not None:
+        product.supplier_id = product_data.supplier_id
+
+    if product_data.quantity is not None:
+        product.quantity = product_data.quantity
+
+    changed_caches = await apply_product_counter_changes(
+        db, before=before, after=product_state(product)
+    )
+    await db.commit()
+    await db.refresh(product)
+    for cache in changed_caches:
+        cache.expire()
 
     return ProductResponse.from_orm(product)
 
-def delete_product(
+async def delete_product(
     product_id: int,
-    db: Session,
+    db: AsyncSession,
     authorization: str,
 ):
-    user = get_user_by_token(authorization, db)
-    check_admin_privileges(user)
-    product = db.query(Product).filter(Product.id == product_id).first()
+    await get_admin_by_token(authorization, db)
+    product = await db.get(Product, product_id, with_for_update=True, populate_existing=True)
     if not product:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Product not found",
         )
 
-    db.delete(product)
-    db.commit()
+    changed_caches = await apply_product_counter_changes(db, before=product_state(product))
+    await release_blob(db, product.photo_path)
+    await db.delete(product)
+    await db.commit()
+    for cache in changed_caches:
+        cache.expire()
 
-def get_product_by_id(
+async def get_product_by_id(
     product_id: int,
-    db: Session,
-) -> ProductResponse:
-    product = db.query(Product).filter(Product.id == product_id).first()
-    if not product:
+    db: AsyncSession,
+    include_placeholder: bool = False,
+    fields: Optional[str] = None,
+    expand: Optional[str] = None,
+) -> ORJSONResponse:
+    selected_fields = parse_product_fields(fields, include_placeholder)
+    relations = parse_product_expand(expand)
+
+    row = (
+        await db.execute(
+            select(*product_columns(selected_fields, relations)).where(
+                Product.id == product_id
+            )
+        )
+    ).first()
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Product not found",
         )
 
-    return ProductResponse.from_orm(product)
+    payloads = await serialize_products(db, [row], selected_fields, relations)
+    return ORJSONResponse(payloads[0])
+
+async def get_products_by_ids(
+    ids: str,
+    db: AsyncSession,
+    include_placeholder: bool = False,
+    fields: Optional[str] = None,
+    expand: Optional[str] = None,
+) -> ORJSONResponse:
+    try:
+        product_ids = list(dict.fromkeys(int(item) for item in ids.split(",") if item.strip()))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ids must be a comma separated list of integers",
+        )
+    if len(product_ids) > MAX_PRODUCTS_PER_REQUEST:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_PRODUCTS_PER_REQUEST} ids can be requested at once",
+        )
+
+    selected_fields = parse_product_fields(fields, include_placeholder)
+    relations = parse_product_expand(expand)
+    if "id" not in selected_fields:
+        selected_fields.insert(0, "id")
+
+    rows = (
+        await db.execute(
+            select(*product_columns(selected_fields, relations)).where(
+                Product.id.in_(product_ids)
+            )
+        )
+    ).all()
+    payloads = {
+        payload["id"]: payload
+        for payload in await serialize_products(db, rows, selected_fields, relations)
+    }
+    return ORJSONResponse(
+        [payloads[product_id] for product_id in product_ids if product_id in payloads]
+    )
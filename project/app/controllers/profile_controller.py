@@ -1,65 +1,97 @@
-import os
-import uuid
-from fastapi import HTTPException, Response, status, UploadFile, Depends
-from sqlalchemy.orm import Session
+from fastapi import HTTPException, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.datastructures import UploadFile
+from starlette.types import Message
 from app.database.tables import User
-from app.core.security import get_user_by_token
-from pathlib import Path
-from shutil import copyfileobj
-import imghdr
-
-AVATAR_FOLDER = Path(__file__).resolve().parent.parent.parent / "static" / "avatars"
-
-ALLOWED_IMAGE_EXTENSIONS = {"png", "jpg", "jpeg"}
-
-random_hash = uuid.uuid4().hex
-
-def create_avatar_file_path(user_id: int, file_extension: str):
-    return AVATAR_FOLDER / f"{user_id}.{file_extension}"
-
-def validate_image(file: UploadFile):
-    file_extension = file.filename.split(".")[-1].lower()
-    if file_extension not in ALLOWED_IMAGE_EXTENSIONS:
+from app.core.security import get_user_by_token, invalidate_cached_user
+from app.core.avatars import (
+    AVATAR_MAX_BYTES,
+    AvatarWorkersUnavailable,
+    InvalidAvatar,
+    process_avatar,
+)
+from app.core.blobs import AVATAR, release_blob, replace_blob
+from app.core.static_files import AVATAR_FOLDER
+
+# Room for the multipart boundaries and part headers around the file itself.
+MULTIPART_OVERHEAD_BYTES = 16 * 1024
+
+async def get_current_user_row(authorization: str, db: AsyncSession) -> User:
+    authenticated_user = await get_user_by_token(authorization, db)
+    return await db.get(User, authenticated_user.id)
+
+def avatar_too_large() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Avatar must be at most {AVATAR_MAX_BYTES} bytes"
+    )
+
+def capped_request(request: Request, max_bytes: int) -> Request:
+    received = 0
+
+    async def receive() -> Message:
+        nonlocal received
+        message = await request.receive()
+        if message["type"] == "http.request":
+            received += len(message.get("body", b""))
+            if received > max_bytes:
+                raise avatar_too_large()
+        return message
+
+    return Request(request.scope, receive)
+
+async def read_avatar_upload(request: Request) -> bytes:
+    max_body_bytes = AVATAR_MAX_BYTES + MULTIPART_OVERHEAD_BYTES
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > max_body_bytes:
+        raise avatar_too_large()
+
+    # The multipart parser consumes the body chunk by chunk and spools the file to disk
+    # through the threadpool, so the upload is aborted as soon as it crosses the cap.
+    async with capped_request(request, max_body_bytes).form(max_files=1, max_fields=0) as form:
+        file = form.get("file")
+        if not isinstance(file, UploadFile):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Expected a multipart upload with a 'file' field"
+            )
+        if file.size is not None and file.size > AVATAR_MAX_BYTES:
+            raise avatar_too_large()
+        return await file.read()
+
+async def upload_user_avatar(request: Request, db: AsyncSession, authorization: str):
+    user = await get_current_user_row(authorization, db)
+    if not user:
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Unsupported file extension. Allowed: {', '.join(ALLOWED_IMAGE_EXTENSIONS)}"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
         )
-    
-    image_type = imghdr.what(file.file)
-    if image_type not in ALLOWED_IMAGE_EXTENSIONS:
+
+    data = await read_avatar_upload(request)
+    try:
+        avatar_url, renditions = await process_avatar(data)
+    except InvalidAvatar:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid image type."
+            detail="Invalid image. Allowed: png, jpeg"
         )
-    return file_extension
-
-async def upload_user_avatar(file: UploadFile, db: Session, authorization: str):
-    user = get_user_by_token(authorization, db)
-    if not user:
+    except AvatarWorkersUnavailable:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Avatar processing is temporarily unavailable"
         )
 
-    file_extension = validate_image(file)
-
-    avatar_path = AVATAR_FOLDER / f"{random_hash}.{file_extension}"
-    AVATAR_FOLDER.mkdir(parents=True, exist_ok=True)
-
-    with avatar_path.open("wb") as buffer:
-        file.file.seek(0)
-        copyfileobj(file.file, buffer)
-    
-    avatar_url = f"{random_hash}.{file_extension}"
+    await replace_blob(db, AVATAR, user.avatar_path, avatar_url, renditions)
     user.avatar_path = avatar_url
-    db.commit()
+    await db.commit()
+    invalidate_cached_user(user.id)
     
     return {"msg": "Avatar uploaded successfully", "avatar_url": avatar_url}
 
 
-async def get_user_avatar(db: Session, authorization: str):
+async def get_user_avatar(db: AsyncSession, authorization: str):
 
-    user = get_user_by_token(authorization, db)
+    user = await get_current_user_row(authorization, db)
     if not user or not user.avatar_path:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -67,7 +99,6 @@ async def get_user_avatar(db: Session, authorization: str):
         )
 
     avatar_file_path = AVATAR_FOLDER / f"{user.avatar_path}"
-    print(avatar_file_path)
     if not avatar_file_path.exists():
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -78,9 +109,9 @@ async def get_user_avatar(db: Session, authorization: str):
     return {"avatar_url": user.avatar_path}
 
 
-async def delete_user_avatar(db: Session, authorization: str):
+async def delete_user_avatar(db: AsyncSession, authorization: str):
 
-    user = get_user_by_token(authorization, db)
+    user = await get_current_user_row(authorization, db)
 
     if not user or not user.avatar_path:
         raise HTTPException(
@@ -88,11 +119,10 @@ async def delete_user_avatar(db: Session, authorization: str):
             detail="Avatar not found"
         )
 
-    avatar_file_path = Path(user.avatar_path)
-    if avatar_file_path.exists():
-        avatar_file_path.unlink()
-
+    # The file may be shared with other users; the blob collector removes it once unreferenced.
+    await release_blob(db, user.avatar_path)
     user.avatar_path = None
-    db.commit()
+    await db.commit()
+    invalidate_cached_user(user.id)
 
     return {"msg": "Avatar deleted successfully"}
\ No newline at end of file
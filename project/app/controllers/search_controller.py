@@ -1,8 +1,16 @@
 from typing import Any, Dict, Optional, List
 from fastapi import HTTPException, status
-from sqlalchemy.orm import Session
-from app.schemas.schemas import ProductResponse
-from app.database.tables import Product, Category, Supplier
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.reference_cache import category_cache, supplier_cache
+from app.database.tables import Product
+from app.utils.product_fields import (
+    parse_product_expand,
+    parse_product_fields,
+    product_columns,
+    serialize_products,
+)
 from datetime import datetime
 
 async def search_for_products_controller(
@@ -15,19 +23,24 @@ async def search_for_products_controller(
     supplier_name: Optional[str],
     limit: int,
     offset: int,
-    db: Session,
-) -> Dict[str, Any]:
-    query = db.query(Product)
+    db: AsyncSession,
+    include_placeholder: bool = False,
+    fields: Optional[str] = None,
+    expand: Optional[str] = None,
+) -> ORJSONResponse:
+    selected_fields = parse_product_fields(fields, include_placeholder)
+    relations = parse_product_expand(expand)
+    query = select(*product_columns(selected_fields, relations))
 
     if product_name:
-        query = query.filter(Product.name.ilike(f"%{product_name}%"))
+        query = query.where(Product.name.ilike(f"%{product_name}%"))
 
     if creation_date_from:
         try:
             creation_date_from = datetime.strptime(
                 creation_date_from, "%Y-%m-%d"
             )
-            query = query.filter(Product.creation_date >= creation_date_from)
+            query = query.where(Product.creation_date >= creation_date_from)
         except ValueError:
             raise HTTPException(
                 status_code=400,
@@ -37,7 +50,7 @@ async def search_for_products_controller(
     if creation_date_to:
         try:
             creation_date_to = datetime.strptime(creation_date_to, "%Y-%m-%d")
-            query = query.filter(Product.creation_date <= creation_date_to)
+            query = query.where(Product.creation_date <= creation_date_to)
         except ValueError:
             raise HTTPException(
                 status_code=400,
@@ -45,23 +58,33 @@ async def search_for_products_controller(
             )
 
     if min_price is not None:
-        query = query.filter(Product.price >= min_price)
+        query = query.where(Product.price >= min_price)
     if max_price is not None:
-        query = query.filter(Product.price <= max_price)
+        query = query.where(Product.price <= max_price)
 
     if category_name:
-        query = query.join(Category).filter(
-            Category.name.ilike(f"%{category_name}%")
-        )
+        needle = category_name.lower()
+        category_ids = [
+            category_id
+            for category_id, category in (await category_cache.get(db)).by_id.items()
+            if needle in (category.name or "").lower()
+        ]
+        query = query.where(Product.category_id.in_(category_ids))
 
     if supplier_name:
-        query = query.join(Supplier).filter(
-            Supplier.name.ilike(f"%{supplier_name}%")
-        )
+        needle = supplier_name.lower()
+        supplier_ids = [
+            supplier_id
+            for supplier_id, supplier in (await supplier_cache.get(db)).by_id.items()
+            if supplier.name and needle in supplier.name.lower()
+        ]
+        query = query.where(Product.supplier_id.in_(supplier_ids))
 
-    total_products = query.count()
+    total_products = await db.scalar(
+        select(func.count()).select_from(query.subquery())
+    )
 
-    products = query.offset(offset).limit(limit).all()
+    products = (await db.execute(query.offset(offset).limit(limit))).all()
 
     if not products:
         raise HTTPException(
@@ -71,10 +94,10 @@ async def search_for_products_controller(
 
     total_pages = (total_products + limit - 1) // limit
 
-    return {
-        "products": [ProductResponse.from_orm(product) for product in products],
+    return ORJSONResponse({
+        "products": await serialize_products(db, products, selected_fields, relations),
         "total_products": total_products,
         "total_pages": total_pages,
         "current_page": (offset // limit) + 1,
         "limit": limit,
-    }
\ No newline at end of file
+    })
\ No newline at end of file
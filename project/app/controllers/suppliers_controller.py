@@ -1,16 +1,16 @@
-from app.core.security import get_user_by_token
-from app.utils.utils import check_admin_privileges
+from app.core.reference_cache import supplier_cache
+from app.core.security import get_admin_by_token
 from app.schemas.schemas import SupplierCreate, SupplierResponse, SupplierUpdate
 from app.database.tables import Supplier
 from fastapi import HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 
 
-def create_supplier(
-    supplier_data: SupplierCreate, db: Session, authorization: str
+async def create_supplier(
+    supplier_data: SupplierCreate, db: AsyncSession, authorization: str
 ) -> SupplierResponse:
-    user = get_user_by_token(authorization, db)
-    check_admin_privileges(user)
+    await get_admin_by_token(authorization, db)
 
     supplier = Supplier(
         name=supplier_data.name,
@@ -18,28 +18,29 @@ def create_supplier(
         phone_number=supplier_data.phone_number,
     )
     db.add(supplier)
-    db.commit()
-    db.refresh(supplier)
+    await supplier_cache.mark_changed(db)
+    await db.commit()
+    await db.refresh(supplier)
+    supplier_cache.expire()
     return SupplierResponse.from_orm(supplier)
 
 
-def get_all_suppliers(
-    db: Session, limit: int, offset: int
-) -> list[SupplierResponse]:
-    suppliers = db.query(Supplier).offset(offset).limit(limit).all()
-    return [SupplierResponse.from_orm(supplier) for supplier in suppliers]
+async def get_all_suppliers(
+    db: AsyncSession, limit: int, offset: int
+) -> ORJSONResponse:
+    payloads = (await supplier_cache.get(db)).payloads
+    return ORJSONResponse(list(payloads[offset:offset + limit]))
 
 
-def update_supplier(
+async def update_supplier(
     supplier_id: int,
     supplier_data: SupplierUpdate,
-    db: Session,
+    db: AsyncSession,
     authorization: str,
 ) -> SupplierResponse:
-    user = get_user_by_token(authorization, db)
-    check_admin_privileges(user)
+    await get_admin_by_token(authorization, db)
 
-    supplier = db.query(Supplier).filter(Supplier.id == supplier_id).first()
+    supplier = await db.get(Supplier, supplier_id)
     if not supplier:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -55,36 +56,39 @@ def update_supplier(
     if supplier_data.phone_number:
         supplier.phone_number = supplier_data.phone_number
 
-    db.commit()
-    db.refresh(supplier)
+    await supplier_cache.mark_changed(db)
+    await db.commit()
+    await db.refresh(supplier)
+    supplier_cache.expire()
 
     return SupplierResponse.from_orm(supplier)
 
 
-def delete_supplier(
+async def delete_supplier(
     supplier_id: int,
-    db: Session,
+    db: AsyncSession,
     authorization: str,
 ):
-    user = get_user_by_token(authorization, db)
-    check_admin_privileges(user)
-    supplier = db.query(Supplier).filter(Supplier.id == supplier_id).first()
+    await get_admin_by_token(authorization, db)
+    supplier = await db.get(Supplier, supplier_id)
     if not supplier:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Supplier not found",
         )
 
-    db.delete(supplier)
-    db.commit()
+    await db.delete(supplier)
+    await supplier_cache.mark_changed(db)
+    await db.commit()
+    supplier_cache.expire()
 
-def get_supplier_by_id(
-    supplier_id: int, db: Session
+async def get_supplier_by_id(
+    supplier_id: int, db: AsyncSession
 ) -> SupplierResponse:
-    supplier = db.query(Supplier).filter(Supplier.id == supplier_id).first()
+    supplier = await supplier_cache.lookup(db, supplier_id)
     if not supplier:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Supplier not found",
         )
-    return SupplierResponse.from_orm(supplier)
+    return supplier
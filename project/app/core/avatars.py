@@ -0,0 +1,76 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional, Tuple
+
+from PIL import Image
+
+from app.core.static_files import content_hash
+from app.utils.images import render_avatar, sniff_image_format
+
+AVATAR_MAX_BYTES = int(os.getenv("AVATAR_MAX_BYTES", str(5 * 1024 * 1024)))
+AVATAR_WORKERS = int(os.getenv("AVATAR_WORKERS", "2"))
+
+logger = logging.getLogger(__name__)
+
+executor: Optional[ProcessPoolExecutor] = None
+
+
+class InvalidAvatar(Exception):
+    pass
+
+
+class AvatarWorkersUnavailable(Exception):
+    pass
+
+
+def get_executor() -> ProcessPoolExecutor:
+    global executor
+    if executor is None:
+        # The app runs logging and driver threads, so workers are spawned rather than forked.
+        executor = ProcessPoolExecutor(
+            max_workers=max(1, AVATAR_WORKERS), mp_context=multiprocessing.get_context("spawn")
+        )
+    return executor
+
+
+def shutdown_avatar_workers():
+    global executor
+    if executor is not None:
+        executor.shutdown(cancel_futures=True)
+        executor = None
+
+
+def discard_broken_executor(broken: ProcessPoolExecutor):
+    global executor
+    if executor is broken:
+        executor = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+async def render_in_worker(data: bytes) -> List[bytes]:
+    loop = asyncio.get_running_loop()
+    # A worker killed mid-render (OOM, decoder crash) breaks the whole pool, so it is
+    # replaced and the render retried once before giving up.
+    for attempt in range(2):
+        pool = get_executor()
+        try:
+            return await loop.run_in_executor(pool, render_avatar, data)
+        except BrokenProcessPool:
+            logger.warning("Avatar worker pool broke, restarting it", extra={"attempt": attempt})
+            discard_broken_executor(pool)
+    raise AvatarWorkersUnavailable("avatar workers keep failing")
+
+
+async def process_avatar(data: bytes) -> Tuple[str, List[bytes]]:
+    if sniff_image_format(data) is None:
+        raise InvalidAvatar("not a PNG or JPEG image")
+    try:
+        renditions = await render_in_worker(data)
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        raise InvalidAvatar(str(e)) from e
+    # Files are written by acquire_blob once the blob row is held.
+    return f"{content_hash(renditions[0])}.png", renditions
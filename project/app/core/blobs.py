@@ -0,0 +1,217 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.static_files import (
+    AVATAR_FOLDER,
+    CONTENT_HASH_PATTERN,
+    IMAGES_FOLDER,
+    write_atomically,
+)
+from app.database.tables import Blob, Product, User
+from app.utils.images import AVATAR_THUMBNAIL_SIZES, PHOTO_SIZES
+
+logger = logging.getLogger(__name__)
+
+BLOB_GC_INTERVAL_SECONDS = float(os.getenv("BLOB_GC_INTERVAL_SECONDS", "3600"))
+BLOB_GC_BATCH_SIZE = int(os.getenv("BLOB_GC_BATCH_SIZE", "500"))
+# Unreferenced blobs are kept this long so a re-upload of the same content can revive them.
+BLOB_GC_GRACE_SECONDS = float(os.getenv("BLOB_GC_GRACE_SECONDS", "3600"))
+
+AVATAR = "avatar"
+PHOTO = "photo"
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def blob_files(kind: str, name: str) -> List[Path]:
+    # Same order as the renditions handed to acquire_blob.
+    if kind == PHOTO:
+        return [IMAGES_FOLDER / f"{width}x{height}" / name for width, height in PHOTO_SIZES]
+    return [AVATAR_FOLDER / name] + [
+        AVATAR_FOLDER / f"{width}x{height}" / name for width, height in AVATAR_THUMBNAIL_SIZES
+    ]
+
+
+def write_blob_files(kind: str, name: str, files: List[bytes]):
+    for path, data in zip(blob_files(kind, name), files):
+        write_atomically(path, data)
+
+
+def upsert_reference(dialect: str, kind: str, name: str):
+    if dialect == "mysql":
+        return (
+            mysql_insert(Blob)
+            .values(name=name, kind=kind, ref_count=1)
+            .on_duplicate_key_update(ref_count=Blob.ref_count + 1, orphaned_at=None)
+        )
+    return (
+        sqlite_insert(Blob)
+        .values(name=name, kind=kind, ref_count=1)
+        .on_conflict_do_update(
+            index_elements=[Blob.name],
+            set_={"ref_count": Blob.ref_count + 1, "orphaned_at": None},
+        )
+    )
+
+
+async def acquire_blob(
+    db: AsyncSession, kind: str, name: Optional[str], files: Optional[List[bytes]] = None
+):
+    if not name:
+        return
+    connection = await db.connection()
+    await connection.execute(upsert_reference(connection.dialect.name, kind, name))
+    ref_count = await connection.scalar(select(Blob.ref_count).where(Blob.name == name))
+    # The upsert holds the row until commit, so the collector cannot remove these files
+    # now, but it may already have removed them along with an earlier row of the same name.
+    # The first reference therefore writes them rather than trusting what is on disk.
+    if files and ref_count == 1:
+        await run_in_threadpool(write_blob_files, kind, name, files)
+
+
+async def release_blob(db: AsyncSession, name: Optional[str]):
+    if not name:
+        return
+    await db.execute(
+        update(Blob)
+        .where(Blob.name == name, Blob.ref_count > 0)
+        .values(ref_count=Blob.ref_count - 1)
+    )
+    await db.execute(
+        update(Blob)
+        .where(Blob.name == name, Blob.ref_count == 0, Blob.orphaned_at.is_(None))
+        .values(orphaned_at=utcnow())
+    )
+
+
+async def replace_blob(
+    db: AsyncSession,
+    kind: str,
+    old: Optional[str],
+    new: Optional[str],
+    files: Optional[List[bytes]] = None,
+):
+    if old == new:
+        return
+    await acquire_blob(db, kind, new, files)
+    await release_blob(db, old)
+
+
+def stored_blob_names() -> Iterable[Tuple[str, str]]:
+    for kind, folder in ((AVATAR, AVATAR_FOLDER), (PHOTO, IMAGES_FOLDER / "1000x1000")):
+        if not folder.exists():
+            continue
+        for path in folder.iterdir():
+            stem, _, extension = path.name.partition(".")
+            if CONTENT_HASH_PATTERN.match(stem) and "." not in extension:
+                yield kind, path.name
+
+
+def reconcile_blob_references(db: Session) -> int:
+    actual = {}
+    for kind, column in ((AVATAR, User.avatar_path), (PHOTO, Product.photo_path)):
+        for name, count in db.execute(
+            select(column, func.count()).where(column.is_not(None)).group_by(column)
+        ):
+            actual[name] = (kind, count)
+
+    now = utcnow()
+    fixed = 0
+    recorded = {name: ref_count for name, ref_count in db.execute(select(Blob.name, Blob.ref_count))}
+    for name, (kind, count) in actual.items():
+        if name not in recorded:
+            db.add(Blob(name=name, kind=kind, ref_count=count))
+            fixed += 1
+        elif recorded[name] != count:
+            db.execute(
+                update(Blob).where(Blob.name == name).values(ref_count=count, orphaned_at=None)
+            )
+            fixed += 1
+
+    stale = [name for name, ref_count in recorded.items() if name not in actual and ref_count]
+    for offset in range(0, len(stale), BLOB_GC_BATCH_SIZE):
+        db.execute(
+            update(Blob)
+            .where(Blob.name.in_(stale[offset:offset + BLOB_GC_BATCH_SIZE]))
+            .values(ref_count=0, orphaned_at=now)
+        )
+    fixed += len(stale)
+
+    # Files written before blobs were tracked, or left behind by the old delete path.
+    for kind, name in stored_blob_names():
+        if name not in actual and name not in recorded:
+            db.add(Blob(name=name, kind=kind, ref_count=0, orphaned_at=now))
+            fixed += 1
+
+    db.commit()
+    return fixed
+
+
+def remove_blob_files(blobs: Iterable[Tuple[str, str]]):
+    for name, kind in blobs:
+        for path in blob_files(kind, name):
+            path.unlink(missing_ok=True)
+
+
+async def collect_orphaned_blobs(
+    db: AsyncSession, batch_size: Optional[int] = None, grace: Optional[float] = None
+) -> int:
+    batch_size = batch_size or BLOB_GC_BATCH_SIZE
+    cutoff = utcnow() - timedelta(seconds=BLOB_GC_GRACE_SECONDS if grace is None else grace)
+    orphaned = (Blob.ref_count == 0, Blob.orphaned_at <= cutoff)
+    collected = 0
+    while True:
+        # Locking the batch makes a concurrent acquire_blob wait until the files are gone and
+        # then recreate the row and its files; rows already being acquired are skipped.
+        batch = (
+            await db.execute(
+                select(Blob.name, Blob.kind)
+                .where(*orphaned)
+                .limit(batch_size)
+                .with_for_update(skip_locked=True)
+            )
+        ).all()
+        if not batch:
+            break
+        names = [name for name, _ in batch]
+        await db.execute(delete(Blob).where(Blob.name.in_(names), *orphaned))
+        # Without row locks (SQLite) a blob can be acquired between the select and the
+        # delete; the delete re-checks it and this finds the ones that survived.
+        kept = set((await db.scalars(select(Blob.name).where(Blob.name.in_(names)))).all())
+        doomed = [(name, kind) for name, kind in batch if name not in kept]
+        await run_in_threadpool(remove_blob_files, doomed)
+        await db.commit()
+        collected += len(doomed)
+        if len(batch) < batch_size:
+            break
+    return collected
+
+
+async def collect_orphaned_blobs_once(session_factory) -> int:
+    async with session_factory() as db:
+        return await collect_orphaned_blobs(db)
+
+
+async def collect_orphaned_blobs_periodically(session_factory, interval: Optional[float] = None):
+    interval = interval or BLOB_GC_INTERVAL_SECONDS
+    while True:
+        try:
+            collected = await collect_orphaned_blobs_once(session_factory)
+            if collected:
+                logger.info("Collected orphaned blobs", extra={"collected": collected})
+        except Exception:
+            logger.exception("Orphaned blob collection failed")
+        await asyncio.sleep(interval)
@@ -0,0 +1,146 @@
+import ipaddress
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from fastapi import HTTPException, Request, status
+
+try:
+    import redis.asyncio as redis_asyncio
+except ImportError:
+    redis_asyncio = None
+
+CREDENTIAL_RATE_PER_IP = float(os.getenv("CREDENTIAL_RATE_PER_IP", "0.5"))
+CREDENTIAL_BURST_PER_IP = int(os.getenv("CREDENTIAL_BURST_PER_IP", "10"))
+CREDENTIAL_RATE_PER_ACCOUNT = float(os.getenv("CREDENTIAL_RATE_PER_ACCOUNT", "0.1"))
+CREDENTIAL_BURST_PER_ACCOUNT = int(os.getenv("CREDENTIAL_BURST_PER_ACCOUNT", "5"))
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL")
+# Comma-separated proxy addresses or networks whose X-Forwarded-For is believed, e.g. the
+# load balancer's subnet. Without it the limits key on the connecting address.
+TRUSTED_PROXIES = [
+    ipaddress.ip_network(proxy.strip())
+    for proxy in os.getenv("TRUSTED_PROXIES", "").split(",")
+    if proxy.strip()
+]
+
+TOKEN_BUCKET_SCRIPT = """
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local tokens = tonumber(state[1]) or burst
+local updated = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local retry_after = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    retry_after = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return tostring(retry_after)
+"""
+
+
+class InMemoryBucketStore:
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def take(self, key: str, rate: float, burst: int) -> float:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            if tokens >= 1:
+                tokens -= 1
+                retry_after = 0.0
+            else:
+                retry_after = (1 - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return retry_after
+
+
+class RedisBucketStore:
+    def __init__(self, url: str):
+        if redis_asyncio is None:
+            raise RuntimeError("RATE_LIMIT_REDIS_URL is set but the redis package is not installed")
+        self._client = redis_asyncio.Redis.from_url(url)
+        self._script = self._client.register_script(TOKEN_BUCKET_SCRIPT)
+
+    async def take(self, key: str, rate: float, burst: int) -> float:
+        retry_after = await self._script(
+            keys=[f"rate_limit:{key}"], args=[rate, burst, time.time()]
+        )
+        return float(retry_after)
+
+
+bucket_store = (
+    RedisBucketStore(RATE_LIMIT_REDIS_URL) if RATE_LIMIT_REDIS_URL else InMemoryBucketStore()
+)
+
+
+def too_many_requests(retry_after: float) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Too many requests",
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+async def enforce_rate_limit(key: str, rate: float, burst: int):
+    retry_after = await bucket_store.take(key, rate, burst)
+    if retry_after > 0:
+        raise too_many_requests(retry_after)
+
+
+def is_trusted_proxy(address: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in TRUSTED_PROXIES)
+
+
+def client_ip(request: Request) -> str:
+    address = request.client.host if request.client else "unknown"
+    if not is_trusted_proxy(address):
+        return address
+    # Each trusted proxy appends the address it received from, so the client is the
+    # rightmost entry not added by one of them; entries further left are client-supplied.
+    forwarded = [
+        hop.strip()
+        for header in request.headers.getlist("x-forwarded-for")
+        for hop in header.split(",")
+        if hop.strip()
+    ]
+    for hop in reversed(forwarded):
+        address = hop
+        if not is_trusted_proxy(hop):
+            break
+    return address
+
+
+async def limit_credential_requests_per_ip(request: Request):
+    await enforce_rate_limit(
+        f"ip:{request.url.path}:{client_ip(request)}",
+        CREDENTIAL_RATE_PER_IP,
+        CREDENTIAL_BURST_PER_IP,
+    )
+
+
+async def limit_credential_requests_per_account(email: str, request: Request):
+    # Keyed on the address too, so failed logins from elsewhere cannot lock the owner out.
+    await enforce_rate_limit(
+        f"account:{email.lower()}:{client_ip(request)}",
+        CREDENTIAL_RATE_PER_ACCOUNT,
+        CREDENTIAL_BURST_PER_ACCOUNT,
+    )
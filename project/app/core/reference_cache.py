@@ -0,0 +1,144 @@
+import asyncio
+import os
+import time
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Mapping, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.database.tables import Category, ReferenceVersion, Supplier
+from app.schemas.schemas import CategoryResponse, SupplierResponse
+
+REFERENCE_CACHE_MAX_STALENESS_SECONDS = float(
+    os.getenv("REFERENCE_CACHE_MAX_STALENESS_SECONDS", "5")
+)
+
+
+@dataclass(frozen=True)
+class ReferenceSnapshot:
+    version: int
+    rows: tuple
+    payloads: tuple
+    by_id: Mapping[int, Any]
+    payload_by_id: Mapping[int, dict]
+
+
+def build_snapshot(version: int, ids: list, items: tuple) -> ReferenceSnapshot:
+    payloads = tuple(item.model_dump(mode="json") for item in items)
+    return ReferenceSnapshot(
+        version=version,
+        rows=items,
+        payloads=payloads,
+        by_id=MappingProxyType(dict(zip(ids, items))),
+        payload_by_id=MappingProxyType(dict(zip(ids, payloads))),
+    )
+
+
+def with_counters(base: ReferenceSnapshot, counters: dict) -> ReferenceSnapshot:
+    ids = list(base.by_id)
+    items = tuple(
+        item.model_copy(update=counters.get(item_id, {}))
+        for item_id, item in zip(ids, base.rows)
+    )
+    return build_snapshot(base.version, ids, items)
+
+
+async def read_version(db: AsyncSession, name: str) -> int:
+    version = await db.scalar(
+        select(ReferenceVersion.version).where(ReferenceVersion.name == name)
+    )
+    return version or 0
+
+
+def bump_version(db: Session, name: str):
+    result = db.execute(
+        update(ReferenceVersion)
+        .where(ReferenceVersion.name == name)
+        .values(version=ReferenceVersion.version + 1)
+    )
+    if not result.rowcount:
+        db.add(ReferenceVersion(name=name, version=1))
+
+
+class ReferenceCache:
+    def __init__(self, name: str, model, schema, counter_columns: tuple = ()):
+        self.name = name
+        self.model = model
+        self.schema = schema
+        # Columns updated by product writes; they are overlaid on the versioned
+        # snapshot instead of bumping its version.
+        self.counter_columns = counter_columns
+        self._base: Optional[ReferenceSnapshot] = None
+        self._counters: Optional[dict] = None
+        self._snapshot: Optional[ReferenceSnapshot] = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def get(self, db: AsyncSession) -> ReferenceSnapshot:
+        snapshot = self._snapshot
+        if (
+            snapshot is not None
+            and time.monotonic() - self._checked_at < REFERENCE_CACHE_MAX_STALENESS_SECONDS
+        ):
+            return snapshot
+        return await self.refresh(db)
+
+    async def load_base(self, db: AsyncSession, version: int) -> ReferenceSnapshot:
+        rows = (await db.scalars(select(self.model).order_by(self.model.id))).all()
+        items = tuple(self.schema.from_orm(row) for row in rows)
+        return build_snapshot(version, [row.id for row in rows], items)
+
+    async def load_counters(self, db: AsyncSession) -> dict:
+        columns = [getattr(self.model, column) for column in self.counter_columns]
+        result = await db.execute(select(self.model.id, *columns))
+        return {row[0]: dict(zip(self.counter_columns, row[1:])) for row in result}
+
+    async def refresh(self, db: AsyncSession) -> ReferenceSnapshot:
+        async with self._lock:
+            version = await read_version(db, self.name)
+            base = self._base
+            # Reads may come from a lagging replica, so an older version never replaces
+            # a snapshot this worker has already loaded.
+            if base is None or version > base.version:
+                base = self._base = await self.load_base(db, version)
+                self._snapshot = base
+
+            if self.counter_columns:
+                counters = await self.load_counters(db)
+                if self._snapshot is base or counters != self._counters:
+                    self._counters = counters
+                    self._snapshot = with_counters(base, counters)
+
+            self._checked_at = time.monotonic()
+            return self._snapshot
+
+    async def lookup(self, db: AsyncSession, item_id: int):
+        item = (await self.get(db)).by_id.get(item_id)
+        if item is None:
+            item = (await self.refresh(db)).by_id.get(item_id)
+        return item
+
+    async def lookup_payloads(self, db: AsyncSession, item_ids) -> dict:
+        payload_by_id = (await self.get(db)).payload_by_id
+        if any(item_id not in payload_by_id for item_id in item_ids):
+            payload_by_id = (await self.refresh(db)).payload_by_id
+        return {
+            item_id: payload_by_id[item_id]
+            for item_id in item_ids
+            if item_id in payload_by_id
+        }
+
+    async def mark_changed(self, db: AsyncSession):
+        await db.run_sync(bump_version, self.name)
+
+    def expire(self):
+        self._checked_at = 0.0
+
+
+COUNTER_COLUMNS = ("product_count", "in_stock_count")
+
+category_cache = ReferenceCache("categories", Category, CategoryResponse, COUNTER_COLUMNS)
+supplier_cache = ReferenceCache("suppliers", Supplier, SupplierResponse, COUNTER_COLUMNS)
@@ -0,0 +1,234 @@
+import asyncio
+import logging
+import os
+import uuid
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import TTLCache
+from app.core.security import REFRESH_TOKEN_EXPIRE_DAYS, create_refresh_token
+from app.database.tables import RefreshToken, RevokedToken
+
+logger = logging.getLogger(__name__)
+
+REFRESH_TOKEN_CACHE_SIZE = int(os.getenv("REFRESH_TOKEN_CACHE_SIZE", "50000"))
+REFRESH_TOKEN_SWEEP_INTERVAL_SECONDS = float(
+    os.getenv("REFRESH_TOKEN_SWEEP_INTERVAL_SECONDS", "600")
+)
+REFRESH_TOKEN_SWEEP_BATCH_SIZE = int(os.getenv("REFRESH_TOKEN_SWEEP_BATCH_SIZE", "1000"))
+
+
+@dataclass(frozen=True)
+class RefreshTokenState:
+    jti: str
+    family_id: str
+    user_id: int
+    expires_at: datetime
+    replaced_by: Optional[str]
+    revoked: bool
+
+
+refresh_token_cache = TTLCache(REFRESH_TOKEN_CACHE_SIZE)
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def cache_state(state: RefreshTokenState):
+    refresh_token_cache.set(
+        state.jti, state, ttl=(state.expires_at - utcnow()).total_seconds()
+    )
+
+
+def invalid_refresh_token(detail: str = "Invalid refresh token") -> HTTPException:
+    return HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=detail)
+
+
+async def issue_refresh_token(
+    db: AsyncSession, user_id: int, email: str, family_id: Optional[str] = None
+) -> Tuple[str, str]:
+    family_id = family_id or uuid.uuid4().hex
+    jti = uuid.uuid4().hex
+    expires_at = utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    db.add(
+        RefreshToken(
+            jti=jti, family_id=family_id, user_id=user_id, expires_at=expires_at
+        )
+    )
+    await db.commit()
+    cache_state(
+        RefreshTokenState(
+            jti=jti,
+            family_id=family_id,
+            user_id=user_id,
+            expires_at=expires_at,
+            replaced_by=None,
+            revoked=False,
+        )
+    )
+    token = create_refresh_token(
+        data={"sub": email, "user_id": user_id, "jti": jti, "fam": family_id},
+        expires_delta=timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+    )
+    return token, family_id
+
+
+async def lookup_refresh_token(db: AsyncSession, jti: str) -> Optional[RefreshTokenState]:
+    state = refresh_token_cache.get(jti)
+    if state is not None:
+        return state
+
+    row = (
+        await db.execute(
+            select(
+                RefreshToken.jti,
+                RefreshToken.family_id,
+                RefreshToken.user_id,
+                RefreshToken.expires_at,
+                RefreshToken.replaced_by,
+                RefreshToken.revoked,
+            ).where(RefreshToken.jti == jti)
+        )
+    ).first()
+    if row is None:
+        return None
+    state = RefreshTokenState(*row)
+    cache_state(state)
+    return state
+
+
+async def revoke_refresh_family(db: AsyncSession, family_id: str):
+    revoked = (
+        await db.scalars(
+            select(RefreshToken.jti).where(RefreshToken.family_id == family_id)
+        )
+    ).all()
+    await db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.family_id == family_id)
+        .values(revoked=True)
+    )
+    await db.commit()
+    for jti in revoked:
+        refresh_token_cache.pop(jti)
+
+
+async def revoke_user_refresh_tokens(db: AsyncSession, user_id: int):
+    revoked = (
+        await db.scalars(
+            select(RefreshToken.jti).where(
+                RefreshToken.user_id == user_id, RefreshToken.revoked.is_(False)
+            )
+        )
+    ).all()
+    await db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.user_id == user_id)
+        .values(revoked=True)
+    )
+    await db.commit()
+    for jti in revoked:
+        refresh_token_cache.pop(jti)
+
+
+async def rotate_refresh_token(db: AsyncSession, token_data: dict) -> Tuple[str, str]:
+    jti = token_data.get("jti")
+    state = await lookup_refresh_token(db, jti) if jti else None
+    if state is None or state.user_id != token_data.get("user_id"):
+        raise invalid_refresh_token()
+    if state.revoked or state.expires_at <= utcnow():
+        raise invalid_refresh_token()
+    if state.replaced_by is not None:
+        await revoke_refresh_family(db, state.family_id)
+        raise invalid_refresh_token("Refresh token reuse detected")
+
+    new_jti = uuid.uuid4().hex
+    claimed = await db.execute(
+        update(RefreshToken)
+        .where(
+            RefreshToken.jti == jti,
+            RefreshToken.replaced_by.is_(None),
+            RefreshToken.revoked.is_(False),
+        )
+        .values(replaced_by=new_jti)
+    )
+    if not claimed.rowcount:
+        await db.rollback()
+        await revoke_refresh_family(db, state.family_id)
+        raise invalid_refresh_token("Refresh token reuse detected")
+
+    expires_at = utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    db.add(
+        RefreshToken(
+            jti=new_jti,
+            family_id=state.family_id,
+            user_id=state.user_id,
+            expires_at=expires_at,
+        )
+    )
+    await db.commit()
+    cache_state(replace(state, replaced_by=new_jti))
+    cache_state(
+        RefreshTokenState(
+            jti=new_jti,
+            family_id=state.family_id,
+            user_id=state.user_id,
+            expires_at=expires_at,
+            replaced_by=None,
+            revoked=False,
+        )
+    )
+    token = create_refresh_token(
+        data={
+            "sub": token_data["sub"],
+            "user_id": state.user_id,
+            "jti": new_jti,
+            "fam": state.family_id,
+        },
+        expires_delta=timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+    )
+    return token, state.family_id
+
+
+async def sweep_expired_tokens(db: AsyncSession, batch_size: Optional[int] = None) -> int:
+    batch_size = batch_size or REFRESH_TOKEN_SWEEP_BATCH_SIZE
+    now = utcnow()
+    swept = 0
+    for model, key in ((RefreshToken, RefreshToken.jti), (RevokedToken, RevokedToken.id)):
+        while True:
+            batch = (
+                await db.scalars(
+                    select(key).where(model.expires_at <= now).limit(batch_size)
+                )
+            ).all()
+            if not batch:
+                break
+            await db.execute(delete(model).where(key.in_(batch)))
+            await db.commit()
+            swept += len(batch)
+            if len(batch) < batch_size:
+                break
+    return swept
+
+
+async def sweep_expired_tokens_once(session_factory) -> int:
+    async with session_factory() as db:
+        return await sweep_expired_tokens(db)
+
+
+async def sweep_expired_tokens_periodically(session_factory, interval: Optional[float] = None):
+    interval = interval or REFRESH_TOKEN_SWEEP_INTERVAL_SECONDS
+    while True:
+        try:
+            swept = await sweep_expired_tokens_once(session_factory)
+            if swept:
+                logger.info("Swept expired tokens", extra={"swept": swept})
+        except Exception:
+            logger.exception("Expired token sweep failed")
+        await asyncio.sleep(interval)
@@ -0,0 +1,105 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.tables import RevokedToken
+
+logger = logging.getLogger(__name__)
+
+REVOCATION_REFRESH_SECONDS = float(os.getenv("REVOCATION_REFRESH_SECONDS", "10"))
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class RevocationFilter:
+    def __init__(self):
+        self.denied_jtis = frozenset()
+        self.user_revoked_at = {}
+
+    def is_revoked(self, token_data: dict) -> bool:
+        jti = token_data.get("jti")
+        if jti and bytes.fromhex(jti) in self.denied_jtis:
+            return True
+        revoked_at = self.user_revoked_at.get(token_data.get("user_id"))
+        return revoked_at is not None and token_data.get("iat", 0) < revoked_at
+
+    def deny_token(self, jti: str):
+        self.denied_jtis = self.denied_jtis | {bytes.fromhex(jti)}
+
+    def deny_user(self, user_id: int, revoked_at: datetime):
+        user_revoked_at = dict(self.user_revoked_at)
+        user_revoked_at[user_id] = revoked_at.replace(tzinfo=timezone.utc).timestamp()
+        self.user_revoked_at = user_revoked_at
+
+    async def refresh(self, db: AsyncSession):
+        now = utcnow()
+        jtis = await db.scalars(
+            select(RevokedToken.jti).where(
+                RevokedToken.jti.isnot(None), RevokedToken.expires_at > now
+            )
+        )
+        users = await db.execute(
+            select(RevokedToken.user_id, func.max(RevokedToken.revoked_at))
+            .where(RevokedToken.jti.is_(None), RevokedToken.expires_at > now)
+            .group_by(RevokedToken.user_id)
+        )
+        self.denied_jtis = frozenset(bytes.fromhex(jti) for jti in jtis)
+        self.user_revoked_at = {
+            user_id: revoked_at.replace(tzinfo=timezone.utc).timestamp()
+            for user_id, revoked_at in users
+        }
+
+
+revocation_filter = RevocationFilter()
+
+
+async def revoke_token(db: AsyncSession, token_data: dict):
+    jti = token_data.get("jti")
+    if not jti:
+        return
+    expires_at = datetime.fromtimestamp(token_data["exp"], tz=timezone.utc).replace(tzinfo=None)
+    db.add(
+        RevokedToken(
+            jti=jti,
+            user_id=token_data.get("user_id"),
+            revoked_at=utcnow(),
+            expires_at=expires_at,
+        )
+    )
+    await db.commit()
+    revocation_filter.deny_token(jti)
+
+
+async def revoke_user_tokens(db: AsyncSession, user_id: int, lifetime: timedelta):
+    revoked_at = utcnow()
+    db.add(
+        RevokedToken(
+            user_id=user_id,
+            revoked_at=revoked_at,
+            expires_at=revoked_at + lifetime,
+        )
+    )
+    await db.commit()
+    revocation_filter.deny_user(user_id, revoked_at)
+
+
+async def refresh_revocation_filter(session_factory):
+    async with session_factory() as db:
+        await revocation_filter.refresh(db)
+
+
+async def refresh_revocations_periodically(session_factory, interval: Optional[float] = None):
+    interval = interval or REVOCATION_REFRESH_SECONDS
+    while True:
+        try:
+            await refresh_revocation_filter(session_factory)
+        except Exception:
+            logger.exception("Revocation filter refresh failed")
+        await asyncio.sleep(interval)
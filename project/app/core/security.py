@@ -1,20 +1,45 @@
+import os
+import time
+import uuid
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
+from typing import Optional
 
+from app.core.cache import TTLCache
+from app.core.revocation import revocation_filter
+from app.database.replica import current_user_id
 from app.database.tables import User
+from app.utils.utils import check_admin_privileges
 from fastapi import HTTPException, Response, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 SECRET_KEY = "supersecretkey"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 15
 REFRESH_TOKEN_EXPIRE_DAYS = 7
 
+AUTH_USER_CACHE_TTL_SECONDS = float(os.getenv("AUTH_USER_CACHE_TTL_SECONDS", "30"))
+AUTH_USER_CACHE_SIZE = int(os.getenv("AUTH_USER_CACHE_SIZE", "10000"))
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000"))
+AUTHZ_MODE = os.getenv("AUTHZ_MODE", "db")
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+user_cache = TTLCache(AUTH_USER_CACHE_SIZE, ttl=AUTH_USER_CACHE_TTL_SECONDS)
+token_cache = TTLCache(AUTH_TOKEN_CACHE_SIZE)
+
+
+@dataclass(frozen=True)
+class AuthenticatedUser:
+    id: int
+    email: str
+    is_admin: bool
+
 
 def create_access_token(data: dict, expires_delta: timedelta = None) -> str:
     to_encode = data.copy()
@@ -24,7 +49,9 @@ def create_access_token(data: dict, expires_delta: timedelta = None) -> str:
         expire = datetime.now(timezone.utc) + timedelta(
             minutes=ACCESS_TOKEN_EXPIRE_MINUTES
         )
-    to_encode.update({"exp": expire})
+    to_encode.update(
+        {"exp": expire, "iat": time.time(), "jti": uuid.uuid4().hex}
+    )
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
@@ -37,7 +64,8 @@ def create_refresh_token(data: dict, expires_delta: timedelta = None) -> str:
         expire = datetime.now(timezone.utc) + timedelta(
             days=REFRESH_TOKEN_EXPIRE_DAYS
         )
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "iat": time.time()})
+    to_encode.setdefault("jti", uuid.uuid4().hex)
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
@@ -87,20 +115,52 @@ def remove_jwt_cookie(response: Response) -> Response:
 
 
 def decode_access_token(token: str):
+    payload = token_cache.get(token)
+    if payload is not None:
+        return payload
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
     except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid token decode",
         )
+    if "exp" in payload:
+        token_cache.set(token, payload, ttl=payload["exp"] - time.time())
+    return payload
+
+
+def invalidate_cached_user(user_id: int):
+    user_cache.pop(user_id)
+
+
+async def load_authenticated_user(user_id: int, db: AsyncSession) -> AuthenticatedUser:
+    cached = user_cache.get(user_id)
+    if cached is not None:
+        return cached
+
+    row = (
+        await db.execute(
+            select(User.id, User.email, User.is_admin).where(User.id == user_id)
+        )
+    ).first()
+    if not row:
+        return None
+    user = AuthenticatedUser(id=row.id, email=row.email, is_admin=bool(row.is_admin))
+    user_cache.set(user_id, user)
+    return user
 
 
-def get_user_by_token(token: str, db: Session):
+async def get_user_by_token(token: str, db: AsyncSession) -> AuthenticatedUser:
     try:
         token_data = decode_access_token(token)
-        user = db.query(User).filter(User.id == token_data["user_id"]).first()
+        if revocation_filter.is_revoked(token_data):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token revoked",
+            )
+        user = await load_authenticated_user(token_data["user_id"], db)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -111,9 +171,35 @@ def get_user_by_token(token: str, db: Session):
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Email mismatch",
             )
+        current_user_id.set(user.id)
         return user
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid token get user",
         )
+
+
+def claimed_admin(token: str) -> Optional[AuthenticatedUser]:
+    try:
+        token_data = decode_access_token(token)
+    except HTTPException:
+        return None
+    if "is_admin" not in token_data or revocation_filter.is_revoked(token_data):
+        return None
+    current_user_id.set(token_data["user_id"])
+    return AuthenticatedUser(
+        id=token_data["user_id"],
+        email=token_data.get("sub"),
+        is_admin=bool(token_data["is_admin"]),
+    )
+
+
+async def get_admin_by_token(token: str, db: AsyncSession) -> AuthenticatedUser:
+    # AUTHZ_MODE=claims trusts the is_admin claim for admin checks only; every other
+    # route still resolves the user from the database.
+    user = claimed_admin(token) if AUTHZ_MODE == "claims" else None
+    if user is None:
+        user = await get_user_by_token(token, db)
+    check_admin_privileges(user)
+    return user
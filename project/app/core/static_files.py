@@ -0,0 +1,169 @@
+import hashlib
+import os
+import re
+import tempfile
+from mimetypes import guess_type
+from pathlib import Path
+from typing import Optional, Tuple
+
+import anyio
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse
+from starlette.types import Receive, Scope, Send
+
+STATIC_FOLDER = Path(__file__).resolve().parent.parent.parent / "static"
+IMAGES_FOLDER = STATIC_FOLDER / "images"
+AVATAR_FOLDER = STATIC_FOLDER / "avatars"
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+CONTENT_HASH_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+CHUNK_SIZE = 64 * 1024
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def write_atomically(path: Path, data: bytes):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    buffer = tempfile.NamedTemporaryFile(dir=path.parent, delete=False)
+    try:
+        with buffer:
+            buffer.write(data)
+        # Readers see either the previous file or the complete new one, never a partial write.
+        os.replace(buffer.name, path)
+    finally:
+        Path(buffer.name).unlink(missing_ok=True)
+
+
+def parse_byte_range(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+    match = RANGE_PATTERN.match(range_header.strip())
+    if not match:
+        raise ValueError(range_header)
+
+    start, end = match.groups()
+    if not start:
+        if not end:
+            raise ValueError(range_header)
+        length = min(int(end), size)
+        if length == 0:
+            return None
+        return size - length, size - 1
+
+    start = int(start)
+    end = int(end) if end else size - 1
+    if start >= size or start > end:
+        return None
+    return start, min(end, size - 1)
+
+
+class FileRangeResponse(FileResponse):
+    def __init__(
+        self,
+        path: str,
+        start: int,
+        end: int,
+        stat_result: os.stat_result,
+        headers: dict,
+        media_type: Optional[str] = None,
+    ):
+        super().__init__(
+            path,
+            status_code=206,
+            headers=headers,
+            media_type=media_type,
+            stat_result=stat_result,
+        )
+        self.start = start
+        self.end = end
+        self.headers["content-length"] = str(end - start + 1)
+        self.headers["content-range"] = f"bytes {start}-{end}/{stat_result.st_size}"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send(
+            {
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": self.raw_headers,
+            }
+        )
+        if scope["method"].upper() == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        remaining = self.end - self.start + 1
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            await file.seek(self.start)
+            while remaining > 0:
+                chunk = await file.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send(
+                    {
+                        "type": "http.response.body",
+                        "body": chunk,
+                        "more_body": remaining > 0,
+                    }
+                )
+        if remaining > 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+class ImmutableStaticFiles(StaticFiles):
+    def file_response(
+        self,
+        full_path,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        path = Path(full_path)
+        media_type = guess_type(path.name)[0] or "text/plain"
+
+        headers = {"accept-ranges": "bytes"}
+        etag = None
+        if CONTENT_HASH_PATTERN.match(path.stem):
+            etag = f'"{path.stem}"'
+            headers["cache-control"] = IMMUTABLE_CACHE_CONTROL
+            headers["etag"] = etag
+
+        range_header = request_headers.get("range")
+        if range_header and status_code == 200 and self.if_range_matches(
+            request_headers, etag
+        ):
+            try:
+                byte_range = parse_byte_range(range_header, stat_result.st_size)
+            except ValueError:
+                # Malformed or multi-part ranges are ignored and the full file is served.
+                pass
+            else:
+                if byte_range is None:
+                    return Response(
+                        status_code=416,
+                        headers={"content-range": f"bytes */{stat_result.st_size}"},
+                    )
+                start, end = byte_range
+                return FileRangeResponse(
+                    full_path, start, end, stat_result, headers, media_type
+                )
+
+        response = FileResponse(
+            full_path,
+            status_code=status_code,
+            headers=headers,
+            media_type=media_type,
+            stat_result=stat_result,
+        )
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+    def if_range_matches(self, request_headers: Headers, etag: Optional[str]) -> bool:
+        if_range = request_headers.get("if-range")
+        return if_range is None or (etag is not None and if_range.strip() == etag)
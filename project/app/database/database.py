@@ -2,9 +2,14 @@ import os
 from pathlib import Path
 from dotenv import load_dotenv
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
+from app.database.pool import instrument_pool, pool_options
+from app.database.replica import PrimarySession
+
 env_path = Path(__file__).resolve().parent.parent.parent.parent / ".env"
 load_dotenv(dotenv_path=env_path)
 
@@ -14,20 +19,82 @@ MYSQL_HOST = os.getenv("MYSQL_HOST", "localhost")
 MYSQL_PORT = os.getenv("MYSQL_PORT", "3306")
 MYSQL_DATABASE = os.getenv("MYSQL_DATABASE")
 MYSQL_ROOT_PASSWORD = os.getenv("MYSQL_ROOT_PASSWORD")
+MYSQL_REPLICA_HOST = os.getenv("MYSQL_REPLICA_HOST")
+MYSQL_REPLICA_PORT = os.getenv("MYSQL_REPLICA_PORT", MYSQL_PORT)
+
+ASYNC_DRIVERS = {"mysql": "mysql+aiomysql", "sqlite": "sqlite+aiosqlite"}
+
+
+def async_url(url: str) -> str:
+    parsed = make_url(url)
+    return parsed.set(drivername=ASYNC_DRIVERS[parsed.get_backend_name()]).render_as_string(
+        hide_password=False
+    )
 
-SQLALCHEMY_DATABASE_URL = f"mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DATABASE}"
-SQLALCHEMY_ROOT_DATABASE_URL = f"mysql+pymysql://root:{MYSQL_ROOT_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DATABASE}"
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL, pool_pre_ping=True)
+# DATABASE_URL lets SQLite or a local MySQL container stand in for the configured server,
+# e.g. "sqlite:///./bench.db"; the async and root URLs are derived from it unless set.
+SQLALCHEMY_DATABASE_URL = os.getenv(
+    "DATABASE_URL",
+    f"mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DATABASE}",
+)
+ASYNC_SQLALCHEMY_DATABASE_URL = os.getenv(
+    "ASYNC_DATABASE_URL", async_url(SQLALCHEMY_DATABASE_URL)
+)
+# REPLICA_DATABASE_URL (or MYSQL_REPLICA_HOST for the MySQL setup) sends read-only endpoints
+# to a replica; without either they read from the primary.
+SQLALCHEMY_REPLICA_URL = os.getenv("REPLICA_DATABASE_URL") or (
+    f"mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_REPLICA_HOST}:{MYSQL_REPLICA_PORT}/{MYSQL_DATABASE}"
+    if MYSQL_REPLICA_HOST
+    else None
+)
+ASYNC_SQLALCHEMY_REPLICA_URL = (
+    async_url(SQLALCHEMY_REPLICA_URL) if SQLALCHEMY_REPLICA_URL else None
+)
+SQLALCHEMY_ROOT_DATABASE_URL = os.getenv("ROOT_DATABASE_URL") or (
+    SQLALCHEMY_DATABASE_URL
+    if os.getenv("DATABASE_URL")
+    else f"mysql+pymysql://root:{MYSQL_ROOT_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DATABASE}"
+)
+
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL, **pool_options("primary", url=SQLALCHEMY_DATABASE_URL)
+)
 root_engine = create_engine(SQLALCHEMY_ROOT_DATABASE_URL, pool_pre_ping=True)
+async_engine = create_async_engine(
+    ASYNC_SQLALCHEMY_DATABASE_URL,
+    **pool_options("primary_async", is_async=True, url=ASYNC_SQLALCHEMY_DATABASE_URL),
+)
+instrument_pool(engine, "primary")
+instrument_pool(async_engine, "primary_async")
+
+async_replica_engine = None
+if ASYNC_SQLALCHEMY_REPLICA_URL:
+    async_replica_engine = create_async_engine(
+        ASYNC_SQLALCHEMY_REPLICA_URL,
+        **pool_options("replica_async", is_async=True, url=ASYNC_SQLALCHEMY_REPLICA_URL),
+    )
+    instrument_pool(async_replica_engine, "replica_async")
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 RootSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=root_engine)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    sync_session_class=PrimarySession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+AsyncReplicaSessionLocal = async_sessionmaker(
+    bind=async_replica_engine or async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
 
 Base = declarative_base()
 
 def get_db():
-    print(MYSQL_USER, MYSQL_PASSWORD, MYSQL_HOST, MYSQL_PORT, MYSQL_DATABASE, MYSQL_ROOT_PASSWORD)
     db = SessionLocal()
     try:
         yield db
@@ -35,9 +102,12 @@ def get_db():
         db.close()
 
 def get_root_db():
-    print(MYSQL_USER, MYSQL_PASSWORD, MYSQL_HOST, MYSQL_PORT, MYSQL_DATABASE, MYSQL_ROOT_PASSWORD)
     root_db = RootSessionLocal()
     try:
         yield root_db
     finally:
-        root_db.close()
\ No newline at end of file
+        root_db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,93 @@
+import hashlib
+import logging
+import os
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+# Flag requests that run the same statement shape more than this many times; 0 disables.
+SQL_N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "0"))
+
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+PLACEHOLDER = re.compile(r"%\(\w+\)s|%s|\?|:\w+")
+VALUE_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_statement(statement: str) -> str:
+    statement = STRING_LITERAL.sub("?", statement)
+    statement = PLACEHOLDER.sub("?", statement)
+    statement = NUMBER_LITERAL.sub("?", statement)
+    statement = VALUE_LIST.sub("(...)", statement)
+    return WHITESPACE.sub(" ", statement).strip()
+
+
+def statement_fingerprint(statement: str) -> str:
+    return hashlib.sha1(normalize_statement(statement).encode()).hexdigest()[:12]
+
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+        self.statements = {}
+        self.trace: Optional[list] = None
+
+    def record(self, statement: str, duration: float):
+        self.count += 1
+        self.duration += duration
+        if self.trace is not None:
+            self.trace.append((statement, duration))
+        if SQL_N_PLUS_ONE_THRESHOLD:
+            fingerprint = statement_fingerprint(statement)
+            self.shapes[fingerprint] += 1
+            self.statements.setdefault(fingerprint, statement)
+
+    def repeated_shapes(self):
+        if not SQL_N_PLUS_ONE_THRESHOLD:
+            return []
+        return [
+            (fingerprint, count)
+            for fingerprint, count in self.shapes.most_common()
+            if count > SQL_N_PLUS_ONE_THRESHOLD
+        ]
+
+
+request_query_stats: ContextVar[Optional[QueryStats]] = ContextVar(
+    "request_query_stats", default=None
+)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def record_query(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - conn.info["query_start_time"].pop()
+
+    stats = request_query_stats.get()
+    if stats is not None:
+        stats.record(statement, duration)
+
+    if duration * 1000 >= SLOW_QUERY_MS:
+        logger.warning(
+            "Slow query",
+            extra={
+                "event": "sql.slow_query",
+                "fingerprint": statement_fingerprint(statement),
+                "duration_ms": round(duration * 1000, 1),
+                "statement": normalize_statement(statement),
+            },
+        )
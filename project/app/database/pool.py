@@ -0,0 +1,123 @@
+import os
+import time
+
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_RECYCLE_SECONDS = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800"))
+DB_POOL_TIMEOUT_SECONDS = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30"))
+# "always" pings on every checkout, "idle" only after DB_POOL_PING_IDLE_SECONDS
+# without use, "never" relies on pool_recycle alone.
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "idle")
+DB_POOL_PING_IDLE_SECONDS = float(os.getenv("DB_POOL_PING_IDLE_SECONDS", "30"))
+
+POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled connection",
+    ["pool"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+POOL_CHECKOUT_TIMEOUTS = Counter(
+    "db_pool_checkout_timeouts_total",
+    "Checkouts that gave up after the pool timeout",
+    ["pool"],
+)
+POOL_IN_USE = Gauge(
+    "db_pool_connections_in_use",
+    "Connections currently checked out",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+POOL_OVERFLOW = Gauge(
+    "db_pool_overflow_connections",
+    "Connections open beyond pool_size",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+POOL_OVERFLOW_CHECKOUTS = Counter(
+    "db_pool_overflow_checkouts_total",
+    "Checkouts served while the pool was in overflow",
+    ["pool"],
+)
+POOL_PINGS = Counter(
+    "db_pool_pings_total", "Liveness pings issued on checkout", ["pool", "result"]
+)
+
+
+class TimedPoolMixin:
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            POOL_CHECKOUT_TIMEOUTS.labels(self.logging_name).inc()
+            raise
+        finally:
+            POOL_CHECKOUT_WAIT.labels(self.logging_name).observe(
+                time.perf_counter() - start
+            )
+
+
+class TimedQueuePool(TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_options(name: str, is_async: bool = False, url: str = None) -> dict:
+    if url is not None:
+        parsed = make_url(url)
+        if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+            # An in-memory database lives in a single connection; keep SQLAlchemy's default pool.
+            return {}
+    return {
+        "poolclass": TimedAsyncAdaptedQueuePool if is_async else TimedQueuePool,
+        "pool_logging_name": name,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_recycle": DB_POOL_RECYCLE_SECONDS,
+        "pool_timeout": DB_POOL_TIMEOUT_SECONDS,
+        "pool_pre_ping": DB_POOL_PRE_PING == "always",
+    }
+
+
+def instrument_pool(engine, name: str):
+    sync_engine = getattr(engine, "sync_engine", engine)
+    pool = sync_engine.pool
+    if not isinstance(pool, QueuePool):
+        return
+
+    @event.listens_for(pool, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        checked_in_at = connection_record.info.get("checked_in_at")
+        if (
+            DB_POOL_PRE_PING == "idle"
+            and checked_in_at is not None
+            and time.monotonic() - checked_in_at > DB_POOL_PING_IDLE_SECONDS
+        ):
+            try:
+                alive = sync_engine.dialect.do_ping(dbapi_connection)
+            except Exception:
+                alive = False
+            POOL_PINGS.labels(name, "ok" if alive else "failed").inc()
+            if not alive:
+                raise exc.DisconnectionError()
+
+        POOL_IN_USE.labels(name).set(pool.checkedout())
+        overflow = max(pool.overflow(), 0)
+        POOL_OVERFLOW.labels(name).set(overflow)
+        if overflow:
+            POOL_OVERFLOW_CHECKOUTS.labels(name).inc()
+
+    @event.listens_for(pool, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        connection_record.info["checked_in_at"] = time.monotonic()
+        # The event fires before the connection is handed back to the pool.
+        POOL_IN_USE.labels(name).set(max(pool.checkedout() - 1, 0))
+        POOL_OVERFLOW.labels(name).set(max(pool.overflow(), 0))
@@ -0,0 +1,79 @@
+import asyncio
+import logging
+import os
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from app.core.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+READ_YOUR_WRITES_MAX_USERS = int(os.getenv("READ_YOUR_WRITES_MAX_USERS", "100000"))
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "2"))
+# 0 disables lag monitoring, e.g. when both URLs point at unreplicated test databases.
+REPLICA_LAG_CHECK_SECONDS = float(os.getenv("REPLICA_LAG_CHECK_SECONDS", "1"))
+
+current_user_id: ContextVar[Optional[int]] = ContextVar("current_user_id", default=None)
+recent_writers = TTLCache(READ_YOUR_WRITES_MAX_USERS, ttl=READ_YOUR_WRITES_SECONDS)
+
+
+class PrimarySession(Session):
+    pass
+
+
+@event.listens_for(PrimarySession, "after_flush")
+def remember_writer(session, flush_context):
+    user_id = current_user_id.get()
+    if user_id is not None:
+        recent_writers.set(user_id, True)
+
+
+def wrote_recently(user_id: Optional[int]) -> bool:
+    return user_id is not None and recent_writers.get(user_id) is not None
+
+
+class ReplicaLagMonitor:
+    def __init__(self):
+        self.lag_seconds: Optional[float] = None
+        self.healthy = REPLICA_LAG_CHECK_SECONDS <= 0
+
+    def usable(self) -> bool:
+        return self.healthy
+
+    async def check(self, engine):
+        try:
+            async with engine.connect() as connection:
+                status = (
+                    await connection.execute(text("SHOW REPLICA STATUS"))
+                ).mappings().first()
+        except Exception as e:
+            logger.warning("Replica lag check failed: %s", e)
+            self.lag_seconds = None
+            self.healthy = False
+            return
+
+        lag = status.get("Seconds_Behind_Source") if status else None
+        self.lag_seconds = float(lag) if lag is not None else None
+        self.healthy = (
+            self.lag_seconds is not None and self.lag_seconds <= REPLICA_MAX_LAG_SECONDS
+        )
+
+
+replica_lag_monitor = ReplicaLagMonitor()
+
+
+async def monitor_replica_lag(engine, interval: Optional[float] = None):
+    interval = interval or REPLICA_LAG_CHECK_SECONDS
+    if interval <= 0:
+        return
+    if engine.dialect.name != "mysql":
+        # Only MySQL reports replication lag; other replicas are trusted as configured.
+        replica_lag_monitor.healthy = True
+        return
+    while True:
+        await replica_lag_monitor.check(engine)
+        await asyncio.sleep(interval)
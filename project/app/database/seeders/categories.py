@@ -1,5 +1,6 @@
 from faker import Faker
 from sqlalchemy.orm import Session
+from app.core.reference_cache import bump_version
 from tqdm import tqdm
 from ..tables import Category
 
@@ -23,4 +24,5 @@ async def seed_categories(db: Session, num_categories: int):
         category = Category(name=name, description=fake.text(max_nb_chars=200))
         db.add(category)
 
+    bump_version(db, "categories")
     db.commit()
@@ -1,61 +1,63 @@
-from faker import Faker
-from sqlalchemy.orm import Session
-from sqlalchemy.sql import text
-from tqdm.asyncio import tqdm
-from ..tables import Order, User, Product
+from datetime import datetime, timedelta
+from sqlalchemy import insert
+from . import parallel
+from ..tables import Order, User, Product, order_product_table
 import random
 
-fake = Faker()
-
-
-async def seed_orders(db: Session, num_orders: int):
-    users_query = db.query(User).all()
-    products_query = db.query(Product).all()
-
-    users = [user.id for user in users_query]
-    products = [product.id for product in products_query]
-
-    order_products_batch = []
-
-    async for _ in tqdm(range(num_orders), desc="Seeding Orders"):
-        order = Order(
-            user_id=fake.random_element(elements=users),
-            status=fake.random_element(
-                elements=["pending", "shipped", "delivered", "cancelled"]
-            ),
-        )
-        db.add(order)
-        db.flush()
-
-        num_products = fake.random_int(min=1, max=5)
-        order_products = random.sample(
-            products, min(num_products, len(products))
-        )
-
-        for product_id in order_products:
-            order_products_batch.append(
-                {
-                    "order_id": order.id,
-                    "product_id": product_id,
-                    "quantity": fake.random_number(digits=2),
-                }
-            )
-
-        if len(order_products_batch) >= 100:
-            db.execute(
-                text(
-                    "INSERT INTO order_product (order_id, product_id, quantity) VALUES (:order_id, :product_id, :quantity)"
-                ),
-                order_products_batch,
-            )
-            db.commit()
-            order_products_batch = []
-
-    if order_products_batch:
-        db.execute(
-            text(
-                "INSERT INTO order_product (order_id, product_id, quantity) VALUES (:order_id, :product_id, :quantity)"
-            ),
-            order_products_batch,
-        )
-        db.commit()
+ORDER_STATUSES = ["pending", "shipped", "delivered", "cancelled"]
+
+
+def insert_order_chunk(chunk) -> int:
+    start_id, count, seed = chunk
+    context = parallel.worker_context
+    rng = random.Random(seed)
+    user_ids = context["user_ids"]
+    product_ids = context["product_ids"]
+    newest = context["newest"]
+
+    orders = []
+    order_products = []
+    for order_id in range(start_id, start_id + count):
+        orders.append({
+            "id": order_id,
+            "user_id": rng.choice(user_ids),
+            "order_date": newest - timedelta(seconds=rng.randrange(365 * 24 * 3600)),
+            "status": rng.choice(ORDER_STATUSES),
+        })
+        num_products = min(rng.randint(1, 5), len(product_ids))
+        for product_id in rng.sample(product_ids, num_products):
+            order_products.append({
+                "order_id": order_id,
+                "product_id": product_id,
+                "quantity": rng.randint(0, 99),
+            })
+
+    with parallel.worker_engine.begin() as connection:
+        connection.execute(insert(Order.__table__), orders)
+        connection.execute(insert(order_product_table), order_products)
+    return count
+
+
+def seed_orders(
+    num_orders: int,
+    workers: int = parallel.SEED_WORKERS,
+    chunk_size: int = parallel.SEED_CHUNK_SIZE,
+    seed: int = 0,
+) -> int:
+    user_ids = parallel.fetch_ids(User.id)
+    product_ids = parallel.fetch_ids(Product.id)
+    if not user_ids or not product_ids:
+        raise RuntimeError("Seed users and products before orders")
+
+    # Ids are assigned here rather than by the database so order lines can be
+    # built without a flush per order.
+    return parallel.run_chunks(
+        insert_order_chunk,
+        parallel.next_id(Order.__table__),
+        num_orders,
+        {"user_ids": user_ids, "product_ids": product_ids, "newest": datetime.now()},
+        "Seeding Orders",
+        workers=workers,
+        chunk_size=chunk_size,
+        seed=seed,
+    )
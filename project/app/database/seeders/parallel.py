@@ -0,0 +1,65 @@
+import multiprocessing
+import os
+from typing import Callable, Iterable, Tuple
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import NullPool
+from tqdm import tqdm
+
+from app.database.database import SQLALCHEMY_DATABASE_URL, engine
+
+SEED_WORKERS = int(os.getenv("SEED_WORKERS", str(os.cpu_count() or 1)))
+SEED_CHUNK_SIZE = int(os.getenv("SEED_CHUNK_SIZE", "5000"))
+
+worker_engine = None
+worker_context = {}
+
+
+def init_worker(database_url: str, context: dict):
+    global worker_engine, worker_context
+    # Connections inherited from the parent process must not be reused after fork.
+    engine.dispose(close=False)
+    connect_args = {}
+    if make_url(database_url).get_backend_name() == "sqlite":
+        # SQLite allows one writer at a time; wait for the lock instead of failing.
+        connect_args["timeout"] = 300
+    worker_engine = create_engine(database_url, poolclass=NullPool, connect_args=connect_args)
+    worker_context = context
+
+
+def fetch_ids(column) -> list:
+    with engine.connect() as connection:
+        return connection.scalars(select(column)).all()
+
+
+def next_id(table) -> int:
+    with engine.connect() as connection:
+        return (connection.scalar(select(func.max(table.c.id))) or 0) + 1
+
+
+def chunks(start_id: int, total: int, chunk_size: int, seed: int) -> Iterable[Tuple[int, int, int]]:
+    for offset in range(0, total, chunk_size):
+        yield start_id + offset, min(chunk_size, total - offset), seed + offset
+
+
+def run_chunks(
+    task: Callable,
+    start_id: int,
+    total: int,
+    context: dict,
+    desc: str,
+    workers: int = SEED_WORKERS,
+    chunk_size: int = SEED_CHUNK_SIZE,
+    seed: int = 0,
+) -> int:
+    inserted = 0
+    with multiprocessing.Pool(
+        processes=max(1, workers),
+        initializer=init_worker,
+        initargs=(SQLALCHEMY_DATABASE_URL, context),
+    ) as pool, tqdm(total=total, desc=desc, unit="rows", unit_scale=True) as progress:
+        for count in pool.imap_unordered(task, chunks(start_id, total, chunk_size, seed)):
+            inserted += count
+            progress.update(count)
+    return inserted
@@ -1,102 +1,113 @@
+import multiprocessing
+from typing import Optional, Tuple
+
 from faker import Faker
-from sqlalchemy.orm import Session
-from tqdm.asyncio import tqdm
+from sqlalchemy import insert
+from tqdm import tqdm
+from . import parallel
 from ..tables import Product, Category, Supplier
-from PIL import Image, ImageDraw
-import os
+from app.core.static_files import content_hash
+from app.utils.images import save_photo_pyramid
+from PIL import Image
 import random
 import numpy as np
-import hashlib
 
-fake = Faker()
 
-def hash_filename(name: str) -> str:
-    return hashlib.sha256(name.encode()).hexdigest()
+SHAPES = ("circle", "square", "triangle")
 
-def generate_gradient_image(file_name: str, base_folder: str, original_width: int = 1000, original_height: int = 1000):
-    random_image = np.random.randint(0, 256, (original_height, original_width, 3), dtype=np.uint8)
-    img = Image.fromarray(random_image)
-    draw = ImageDraw.Draw(img)
 
-    shape_size = random.randint(200, 500)
-    shape_color = tuple(random.randint(0, 255) for _ in range(3))
-    center_x, center_y = original_width // 2, original_height // 2
+def generate_gradient_image(
+    original_width: int = 1000, original_height: int = 1000, seed: Optional[int] = None
+) -> Image.Image:
+    rng = np.random.default_rng(seed)
+    pixels = rng.integers(0, 256, (original_height, original_width, 3), dtype=np.uint8)
 
-    shape_type = random.choice(['circle', 'square', 'triangle'])
-    if shape_type == 'circle':
-        draw.ellipse(
-            [(center_x - shape_size // 2, center_y - shape_size // 2),
-             (center_x + shape_size // 2, center_y + shape_size // 2)],
-            fill=shape_color
-        )
-    elif shape_type == 'square':
-        draw.rectangle(
-            [(center_x - shape_size // 2, center_y - shape_size // 2),
-             (center_x + shape_size // 2, center_y + shape_size // 2)],
-            fill=shape_color
-        )
-    elif shape_type == 'triangle':
-        points = [
-            (center_x, center_y - shape_size // 2),
-            (center_x - shape_size // 2, center_y + shape_size // 2),
-            (center_x + shape_size // 2, center_y + shape_size // 2)
-        ]
-        draw.polygon(points, fill=shape_color)
-
-    sizes = [(500, 500), (100, 100), (1000, 1000), (10, 10)]
-    
-    for size in sizes:
-        size_folder = os.path.join(base_folder, f"{size[0]}x{size[1]}")
-        os.makedirs(size_folder, exist_ok=True)
-
-        resized_img = img.resize(size, Image.Resampling.LANCZOS)
-
-        resized_img.save(os.path.join(size_folder, f"{file_name}.png"), format='PNG')
-
-
-
-async def seed_products(db: Session, num_products: int, batch_size: int = 1000):
-    categories = db.query(Category).all()
-    suppliers = db.query(Supplier).all()
-
-    category_ids = [c.id for c in categories]
-    supplier_ids = [s.id for s in suppliers]
-    products_to_add = []
-    
-    name_count = {}
-
-    async for _ in tqdm(range(num_products), desc="Seeding Products"):
-        base_name = fake.word()
-
-        if base_name in name_count:
-            name_count[base_name] += 1
-            product_name = f"{base_name}{name_count[base_name]}"
-        else:
-            name_count[base_name] = 1
-            product_name = base_name
-
-        hashed_name = hash_filename(product_name)
-        photo_folder = f"static/images/"
-        os.makedirs(photo_folder, exist_ok=True)
-
-        generate_gradient_image(hashed_name, photo_folder)
-
-        product = Product(
-            name=product_name,
-            description=fake.text(max_nb_chars=200),
-            price=fake.random_number(digits=3),
-            category_id=fake.random_element(elements=category_ids),
-            supplier_id=fake.random_element(elements=supplier_ids),
-            quantity=fake.random_number(digits=2),
-            photo_path=f"{hashed_name}.png"
+    half = int(rng.integers(200, 501)) // 2
+    shape_color = rng.integers(0, 256, 3, dtype=np.uint8)
+    center_x, center_y = original_width // 2, original_height // 2
+    y, x = np.ogrid[:original_height, :original_width]
+    dx, dy = x - center_x, y - center_y
+
+    shape_type = SHAPES[rng.integers(len(SHAPES))]
+    if shape_type == "circle":
+        mask = dx * dx + dy * dy <= half * half
+    elif shape_type == "square":
+        mask = (np.abs(dx) <= half) & (np.abs(dy) <= half)
+    else:
+        # Apex at the top centre, base spanning the full shape width at the bottom.
+        mask = (dy >= -half) & (dy <= half) & (2 * np.abs(dx) <= dy + half)
+    pixels[mask] = shape_color
+
+    return Image.fromarray(pixels)
+
+
+def render_photo(seed: int) -> Tuple[str, str]:
+    img = generate_gradient_image(seed=seed)
+    hashed_name = content_hash(img.tobytes())
+    placeholder = save_photo_pyramid(img, hashed_name, skip_existing=True)
+    return f"{hashed_name}.png", placeholder
+
+
+def generate_photo_pool(count: int, workers: int = parallel.SEED_WORKERS, seed: int = 0) -> list:
+    # Photos are seeded, so rerunning with the same seed finds every pyramid already on disk.
+    with multiprocessing.Pool(processes=max(1, workers)) as pool:
+        return list(
+            tqdm(
+                pool.imap(render_photo, range(seed, seed + count)),
+                total=count,
+                desc="Generating Photos",
+            )
         )
-        products_to_add.append(product)
 
-        if len(products_to_add) >= batch_size:
-            db.bulk_save_objects(products_to_add)
-            db.commit()
-            products_to_add = []
 
-    if products_to_add:
-        db.bulk_save_objects(products_to_add)
-        db.commit()
+def insert_product_chunk(chunk) -> int:
+    start_id, count, seed = chunk
+    context = parallel.worker_context
+    rng = random.Random(seed)
+    fake = Faker()
+    fake.seed_instance(seed)
+    words = [fake.word() for _ in range(200)]
+    descriptions = [fake.text(max_nb_chars=200) for _ in range(50)]
+
+    rows = []
+    for product_id in range(start_id, start_id + count):
+        photo_path, placeholder = rng.choice(context["photos"]) if context["photos"] else (None, None)
+        rows.append({
+            "id": product_id,
+            "name": f"{rng.choice(words)}{product_id}",
+            "description": rng.choice(descriptions),
+            "price": rng.randint(0, 999),
+            "category_id": rng.choice(context["category_ids"]),
+            "supplier_id": rng.choice(context["supplier_ids"]),
+            "quantity": rng.randint(0, 99),
+            "photo_path": photo_path,
+            "placeholder": placeholder,
+        })
+
+    with parallel.worker_engine.begin() as connection:
+        connection.execute(insert(Product.__table__), rows)
+    return count
+
+
+def seed_products(
+    num_products: int,
+    photo_pool_size: int = 100,
+    workers: int = parallel.SEED_WORKERS,
+    chunk_size: int = parallel.SEED_CHUNK_SIZE,
+    seed: int = 0,
+) -> int:
+    category_ids = parallel.fetch_ids(Category.id)
+    supplier_ids = parallel.fetch_ids(Supplier.id)
+    # Products share a pool of photos instead of rendering a pyramid per row.
+    photos = generate_photo_pool(min(photo_pool_size, num_products), workers, seed)
+
+    return parallel.run_chunks(
+        insert_product_chunk,
+        parallel.next_id(Product.__table__),
+        num_products,
+        {"category_ids": category_ids, "supplier_ids": supplier_ids, "photos": photos},
+        "Seeding Products",
+        workers=workers,
+        chunk_size=chunk_size,
+        seed=seed,
+    )
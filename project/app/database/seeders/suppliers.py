@@ -1,5 +1,6 @@
 from faker import Faker
 from sqlalchemy.orm import Session
+from app.core.reference_cache import bump_version
 from tqdm.asyncio import tqdm
 from ..tables import Supplier
 
@@ -36,4 +37,5 @@ async def seed_suppliers(db: Session, num_suppliers: int):
         )
         db.add(supplier)
 
+    bump_version(db, "suppliers")
     db.commit()
@@ -8,6 +8,7 @@ from sqlalchemy import (
     ForeignKey,
     Table,
 )
+from sqlalchemy.dialects import mysql
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
@@ -34,7 +35,7 @@ class User(Base):
     email = Column(String(100), unique=True, index=True)
     password_hash = Column(String(128), nullable=True)
     is_admin = Column(Boolean, default=False)
-    avatar_path = Column(String(200), nullable=True, unique=True)
+    avatar_path = Column(String(200), nullable=True, index=True)
 
     user_type = Column(Enum(UserType), default=UserType.default)
 
@@ -48,6 +49,8 @@ class Supplier(Base):
     name = Column(String(100), unique=True, index=True)
     contact_email = Column(String(100), unique=True, index=True)
     phone_number = Column(String(20), unique=True, index=True)
+    product_count = Column(Integer, default=0, nullable=False)
+    in_stock_count = Column(Integer, default=0, nullable=False)
 
     products = relationship("Product", back_populates="supplier")
 
@@ -58,6 +61,8 @@ class Category(Base):
     id = Column(Integer, primary_key=True, index=True, unique=True)
     name = Column(String(50), unique=True, index=True)
     description = Column(String(1000))
+    product_count = Column(Integer, default=0, nullable=False)
+    in_stock_count = Column(Integer, default=0, nullable=False)
 
     products = relationship("Product", back_populates="category")
 
@@ -77,7 +82,8 @@ class Product(Base):
         Integer, ForeignKey("suppliers.id"), nullable=False, index=True
     )
     quantity = Column(Integer, default=0, index=True)
-    photo_path = Column(String(200), nullable=True, unique=True)
+    photo_path = Column(String(200), nullable=True, index=True)
+    placeholder = Column(String(1000), nullable=True)
     category = relationship("Category", back_populates="products")
     supplier = relationship("Supplier", back_populates="products")
     orders = relationship(
@@ -101,3 +107,47 @@ class Order(Base):
     products = relationship(
         "Product", secondary=order_product_table, back_populates="orders"
     )
+
+
+class ReferenceVersion(Base):
+    __tablename__ = "reference_versions"
+
+    name = Column(String(50), primary_key=True)
+    version = Column(Integer, default=0, nullable=False)
+
+
+class RevokedToken(Base):
+    __tablename__ = "revoked_tokens"
+
+    id = Column(Integer, primary_key=True, index=True, unique=True)
+    jti = Column(String(32), nullable=True, index=True)
+    user_id = Column(Integer, nullable=True, index=True)
+    # Sub-second, so a token issued just after a revoke-all in the same second stays valid.
+    revoked_at = Column(
+        DateTime().with_variant(mysql.DATETIME(fsp=6), "mysql"),
+        default=func.now(),
+        nullable=False,
+    )
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+
+class RefreshToken(Base):
+    __tablename__ = "refresh_tokens"
+
+    jti = Column(String(32), primary_key=True)
+    family_id = Column(String(32), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    issued_at = Column(DateTime, default=func.now(), nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    replaced_by = Column(String(32), nullable=True)
+    revoked = Column(Boolean, default=False, nullable=False)
+
+
+class Blob(Base):
+    __tablename__ = "blobs"
+
+    name = Column(String(200), primary_key=True)
+    kind = Column(String(20), nullable=False)
+    ref_count = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, default=func.now(), nullable=False)
+    orphaned_at = Column(DateTime, nullable=True, index=True)
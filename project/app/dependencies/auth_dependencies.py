@@ -1,16 +1,17 @@
 from app.core.security import decode_access_token
 from app.database.tables import User
-from app.database.database import get_db
+from app.database.database import get_async_db
 from fastapi import Depends, HTTPException, Header, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 
-def get_user_by_token(
-    authorization: str = Header(None), db: Session = Depends(get_db)
+async def get_user_by_token(
+    authorization: str = Header(None), db: AsyncSession = Depends(get_async_db)
 ) -> User:
     token = authorization.split(" ")[1]
     payload = decode_access_token(token)
-    user = db.query(User).filter(User.id == payload.get("user_id")).first()
+    user = await db.scalar(select(User).where(User.id == payload.get("user_id")))
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -0,0 +1,35 @@
+from typing import Optional
+
+from fastapi import HTTPException, Request
+
+from app.core.security import decode_access_token
+from app.database.database import (
+    AsyncReplicaSessionLocal,
+    AsyncSessionLocal,
+    async_replica_engine,
+)
+from app.database.replica import replica_lag_monitor, wrote_recently
+
+
+def request_user_id(request: Request) -> Optional[int]:
+    authorization = request.headers.get("authorization")
+    if not authorization:
+        return None
+    try:
+        return decode_access_token(authorization).get("user_id")
+    except HTTPException:
+        return None
+
+
+def use_replica(request: Request) -> bool:
+    return (
+        async_replica_engine is not None
+        and replica_lag_monitor.usable()
+        and not wrote_recently(request_user_id(request))
+    )
+
+
+async def get_read_db(request: Request):
+    session_factory = AsyncReplicaSessionLocal if use_replica(request) else AsyncSessionLocal
+    async with session_factory() as db:
+        yield db
@@ -0,0 +1,164 @@
+import hmac
+import logging
+import os
+import time
+
+from prometheus_client import REGISTRY, CollectorRegistry, Gauge, Histogram, multiprocess
+from prometheus_client import make_asgi_app, start_http_server
+from starlette.datastructures import Headers
+from starlette.responses import PlainTextResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+# /metrics is only mounted on the public app when a bearer token is configured.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+# Alternatively serve metrics from a separate listener, by default only on loopback.
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+METRICS_ADDR = os.getenv("METRICS_ADDR", "127.0.0.1")
+# Required with more than one worker process (uvicorn --workers, gunicorn): each worker
+# writes its samples to this directory and any of them can export the combined view.
+# It must be emptied before the server starts.
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+UNMATCHED_ROUTE = "unmatched"
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Time spent handling a request, by route template and status",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "Requests currently being handled",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes",
+    "Response body size as sent on the wire, by route template",
+    ["method", "route"],
+    buckets=(100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000),
+)
+
+_duration_children = {}
+_size_children = {}
+_in_progress_children = {}
+
+
+def route_template(scope: Scope, root_path: str) -> str:
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    mounted_at = scope.get("root_path", "")
+    if mounted_at != root_path:
+        return mounted_at[len(root_path):] or "/"
+    return UNMATCHED_ROUTE
+
+
+def duration_child(method: str, route: str, status: str):
+    key = (method, route, status)
+    child = _duration_children.get(key)
+    if child is None:
+        child = _duration_children[key] = REQUEST_DURATION.labels(*key)
+    return child
+
+
+def size_child(method: str, route: str):
+    key = (method, route)
+    child = _size_children.get(key)
+    if child is None:
+        child = _size_children[key] = RESPONSE_SIZE.labels(*key)
+    return child
+
+
+def in_progress_child(method: str):
+    child = _in_progress_children.get(method)
+    if child is None:
+        child = _in_progress_children[method] = REQUESTS_IN_PROGRESS.labels(method)
+    return child
+
+
+class PrometheusMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        root_path = scope.get("root_path", "")
+        in_progress = in_progress_child(method)
+        status_code = 500
+        size = 0
+
+        async def send_with_metrics(message: Message) -> None:
+            nonlocal status_code, size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        in_progress.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            duration = time.perf_counter() - start
+            in_progress.dec()
+            route = route_template(scope, root_path)
+            duration_child(method, route, str(status_code)).observe(duration)
+            size_child(method, route).observe(size)
+
+
+class MetricsAuthMiddleware:
+    def __init__(self, app: ASGIApp, token: str):
+        self.app = app
+        self.token = token.encode()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            scheme, _, credentials = Headers(scope=scope).get("authorization", "").partition(" ")
+            if scheme.lower() != "bearer" or not hmac.compare_digest(credentials.encode(), self.token):
+                response = PlainTextResponse(
+                    "Unauthorized", status_code=401, headers={"WWW-Authenticate": "Bearer"}
+                )
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+
+def metrics_registry():
+    if not PROMETHEUS_MULTIPROC_DIR:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def metrics_app(token: str) -> ASGIApp:
+    return MetricsAuthMiddleware(make_asgi_app(metrics_registry()), token)
+
+
+def start_metrics_server():
+    if not METRICS_PORT:
+        return None
+    try:
+        server, _ = start_http_server(METRICS_PORT, addr=METRICS_ADDR, registry=metrics_registry())
+    except OSError:
+        if PROMETHEUS_MULTIPROC_DIR:
+            # Another worker already serves the port, and exports this worker's samples too.
+            return None
+        logger.warning("Metrics port unavailable", extra={"port": METRICS_PORT}, exc_info=True)
+        return None
+    return server
+
+
+def mark_worker_stopped():
+    if PROMETHEUS_MULTIPROC_DIR:
+        # Drops this worker's live gauges, such as in-flight requests, from the combined view.
+        multiprocess.mark_process_dead(os.getpid())
@@ -0,0 +1,201 @@
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.security import get_user_by_token
+from app.database.database import AsyncSessionLocal
+from app.database.instrumentation import (
+    normalize_statement,
+    request_query_stats,
+    statement_fingerprint,
+)
+
+logger = logging.getLogger(__name__)
+
+# Allow admins to profile a single request by sending "X-Profile: 1".
+PROFILE_ON_HEADER = os.getenv("PROFILE_ON_HEADER", "false").lower() == "true"
+# Fraction of all requests to profile regardless of headers; 0 disables.
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", "profiles"))
+# Only the most recent profiles are kept; older ones are deleted as new ones are written.
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "500"))
+
+PROFILING_ENABLED = PROFILE_ON_HEADER or PROFILE_SAMPLE_RATE > 0
+PROJECT_ROOT = str(Path(__file__).resolve().parent.parent.parent) + os.sep
+AWAITING_FRAME = "[awaiting]"
+SQL_FRAME = "[sql]"
+
+
+def frame_label(frame) -> str:
+    code = frame.f_code
+    filename = code.co_filename
+    if filename.startswith(PROJECT_ROOT):
+        filename = filename[len(PROJECT_ROOT):]
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{name} ({filename}:{code.co_firstlineno})"
+
+
+class StackSampler(threading.Thread):
+    def __init__(self, thread_id: int, marker, interval: float):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.marker = marker
+        self.interval = interval
+        self.samples = Counter()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None and frame is not self.marker:
+                stack.append(frame_label(frame))
+                frame = frame.f_back
+            if frame is None:
+                # The request is suspended on I/O or another task holds the loop.
+                self.samples[AWAITING_FRAME] += 1
+            elif stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self.stopped.set()
+
+
+async def is_admin_request(headers: Headers) -> bool:
+    authorization = headers.get("authorization")
+    if not authorization:
+        return False
+    # Checked against the database even with AUTHZ_MODE=claims, so a demoted admin's
+    # still-valid token cannot keep profiling.
+    async with AsyncSessionLocal() as db:
+        try:
+            user = await get_user_by_token(authorization, db)
+        except HTTPException:
+            return False
+    return user.is_admin
+
+
+async def should_profile(scope: Scope) -> bool:
+    if PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE:
+        return True
+    if not PROFILE_ON_HEADER:
+        return False
+    headers = Headers(scope=scope)
+    return headers.get("x-profile") == "1" and await is_admin_request(headers)
+
+
+def folded_stacks(samples: Counter, sql_trace: list, interval: float) -> str:
+    sample_us = int(interval * 1_000_000)
+    weights = Counter({stack: count * sample_us for stack, count in samples.items()})
+
+    sql_us = 0
+    for statement, duration in sql_trace:
+        duration_us = int(duration * 1_000_000)
+        sql_us += duration_us
+        shape = normalize_statement(statement)[:120].replace(";", ",")
+        weights[f"{SQL_FRAME};{statement_fingerprint(statement)} {shape}"] += duration_us
+
+    # Queries run while the request is awaiting the driver, so don't count that time twice.
+    weights[AWAITING_FRAME] = max(0, weights[AWAITING_FRAME] - sql_us)
+    return "".join(
+        f"{stack} {weight}\n" for stack, weight in weights.most_common() if weight > 0
+    )
+
+
+def write_profile(profile_id: str, folded: str, summary: dict):
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    (PROFILE_DIR / f"{profile_id}.folded").write_text(folded)
+    (PROFILE_DIR / f"{profile_id}.json").write_text(json.dumps(summary, indent=2))
+    prune_profiles()
+
+
+def prune_profiles():
+    # Profile ids start with their timestamp, so name order is age order.
+    profiles = sorted(PROFILE_DIR.glob("*.json"))
+    for summary_path in profiles[:max(0, len(profiles) - PROFILE_MAX_FILES)]:
+        summary_path.with_suffix(".folded").unlink(missing_ok=True)
+        summary_path.unlink(missing_ok=True)
+
+
+class ProfilingMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not await should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        stats = request_query_stats.get()
+        sql_trace = []
+        if stats is not None:
+            stats.trace = sql_trace
+        status_code = 500
+
+        async def send_with_profile_id(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                MutableHeaders(scope=message)["X-Profile-Id"] = profile_id
+            await send(message)
+
+        interval = PROFILE_INTERVAL_MS / 1000
+        sampler = StackSampler(threading.get_ident(), sys._getframe(), interval)
+        start = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            duration = time.perf_counter() - start
+            sampler.stop()
+            # The sampler may be mid-walk; wait for it without holding up the event loop.
+            await run_in_threadpool(sampler.join)
+            route = scope.get("route")
+            summary = {
+                "id": profile_id,
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": route.path if route is not None else None,
+                "status": status_code,
+                "duration_ms": round(duration * 1000, 3),
+                "interval_ms": PROFILE_INTERVAL_MS,
+                "samples": sum(sampler.samples.values()),
+                "sql_count": len(sql_trace),
+                "sql_ms": round(sum(elapsed for _, elapsed in sql_trace) * 1000, 3),
+                "sql": [
+                    {
+                        "fingerprint": statement_fingerprint(statement),
+                        "statement": normalize_statement(statement),
+                        "duration_ms": round(elapsed * 1000, 3),
+                    }
+                    for statement, elapsed in sql_trace
+                ],
+            }
+            folded = folded_stacks(sampler.samples, sql_trace, interval)
+            try:
+                await run_in_threadpool(write_profile, profile_id, folded, summary)
+                logger.info(
+                    "Request profiled",
+                    extra={
+                        "event": "profile",
+                        "profile_id": profile_id,
+                        "path": scope["path"],
+                        "duration_ms": summary["duration_ms"],
+                    },
+                )
+            except OSError:
+                logger.exception("Writing profile failed")
@@ -0,0 +1,64 @@
+import logging
+import time
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.database.instrumentation import (
+    SQL_N_PLUS_ONE_THRESHOLD,
+    QueryStats,
+    normalize_statement,
+    request_query_stats,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class SQLTimingMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = request_query_stats.set(stats)
+        start = time.perf_counter()
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                total_ms = (time.perf_counter() - start) * 1000
+                headers.append(
+                    "Server-Timing",
+                    f'db;dur={stats.duration * 1000:.2f};desc="{stats.count} queries", '
+                    f"app;dur={total_ms:.2f}",
+                )
+                headers["X-DB-Query-Count"] = str(stats.count)
+
+                repeated = stats.repeated_shapes()
+                if repeated:
+                    headers["X-SQL-N-Plus-One"] = ", ".join(
+                        f"{fingerprint}={count}" for fingerprint, count in repeated
+                    )
+                    for fingerprint, count in repeated:
+                        logger.warning(
+                            "Possible N+1",
+                            extra={
+                                "event": "sql.n_plus_one",
+                                "method": scope["method"],
+                                "path": scope["path"],
+                                "fingerprint": fingerprint,
+                                "count": count,
+                                "threshold": SQL_N_PLUS_ONE_THRESHOLD,
+                                "statement": normalize_statement(stats.statements[fingerprint]),
+                            },
+                        )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            request_query_stats.reset(token)
@@ -1,7 +1,8 @@
 from fastapi import APIRouter, Depends, Header, Request, Response
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.schemas.schemas import TokenResponse, UserCreate, LoginFrom, UserInfo
-from app.database.database import get_db
+from app.database.database import get_async_db
+from app.core.rate_limit import limit_credential_requests_per_ip
 from app.controllers.auth_controller import (
     handle_google_callback,
     login_user,
@@ -20,25 +21,30 @@ async def login_with_google(request: Request):
     return await login_via_google(request)
 
 @router.get("/google/callback")
-async def google_callback(request: Request, db: Session = Depends(get_db)):
+async def google_callback(request: Request, db: AsyncSession = Depends(get_async_db)):
     return await handle_google_callback(request, db)
 
-@router.post("/login", response_model=TokenResponse)
+@router.post(
+    "/login",
+    response_model=TokenResponse,
+    dependencies=[Depends(limit_credential_requests_per_ip)],
+)
 async def login(
+    request: Request,
     form_data: LoginFrom,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     response: Response = Response(),
 ):
-    return  login_user(form_data, db, response)
+    return await login_user(form_data, db, response, request)
 
 
 @router.post("/refresh", response_model=TokenResponse)
 async def refresh_token_auth(
     response: Response,
     refresh_token: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    return  refresh_access_token(response, refresh_token, db)
+    return await refresh_access_token(response, refresh_token, db)
 
 
 @router.post(
@@ -46,10 +52,18 @@ async def refresh_token_auth(
     summary="Logout User",
     response_description="Successfully logged out",
 )
-async def logout(response: Response, authorization: str = Header(None)):
-    return  logout_user(response, authorization)
+async def logout(
+    response: Response,
+    authorization: str = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await logout_user(response, authorization, db)
 
 
-@router.post("/register", response_model=UserCreate)
-async def register_user(user_data: UserCreate, db: Session = Depends(get_db)):
-    return  register_new_user(user_data, db)
+@router.post(
+    "/register",
+    response_model=UserCreate,
+    dependencies=[Depends(limit_credential_requests_per_ip)],
+)
+async def register_user(user_data: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    return await register_new_user(user_data, db)
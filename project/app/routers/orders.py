@@ -8,9 +8,10 @@ from app.controllers.orders_controller import (
     delete_order,
 )
 from app.schemas.schemas import OrderCreate, OrderResponse, OrderUpdate
-from app.database.database import get_db
+from app.database.database import get_async_db
+from app.dependencies.db_dependencies import get_read_db
 from fastapi import APIRouter, Depends, Header, Query, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 
 router = APIRouter(prefix="/api/orders", tags=["orders"])
@@ -19,48 +20,48 @@ router = APIRouter(prefix="/api/orders", tags=["orders"])
 @router.post("/", response_model=OrderResponse)
 async def create_new_order(
     order_data: OrderCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     authorization: str = Header(None),
 ):
-    return create_order(order_data, db, authorization)
+    return await create_order(order_data, db, authorization)
 
 @router.get("/my-orders", response_model=Dict[str, Any])
 async def fetch_my_orders(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     authorization: str = Header(None),
     limit: Optional[int] = Query(10, ge=1),
     offset: Optional[int] = Query(0, ge=0),
     status: Optional[str] = Query(None)
 ):
-    return get_orders_by_user(db, authorization, limit, offset, status)
+    return await get_orders_by_user(db, authorization, limit, offset, status)
 
 
 
 
 @router.get("/", response_model=List[OrderResponse])
 async def fetch_all_orders(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     authorization: str = Header(None),
     limit: Optional[int] = Query(10, ge=1),
     offset: Optional[int] = Query(0, ge=0),
 ):
-    return get_all_orders(db, authorization, limit, offset)
+    return await get_all_orders(db, authorization, limit, offset)
 
 
 @router.put("/{order_id}", response_model=OrderResponse)
 async def update_existing_order(
     order_id: int,
     order_data: OrderUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     authorization: str = Header(None),
 ):
-    return update_order(order_id, order_data, db, authorization)
+    return await update_order(order_id, order_data, db, authorization)
 
 
 @router.delete("/{order_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_existing_order(
     order_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     authorization: str = Header(None),
 ):
-    return delete_order(order_id, db, authorization)
+    return await delete_order(order_id, db, authorization)
@@ -3,13 +3,20 @@ from typing import List, Optional
 from app.controllers.products_controller import (
     create_product,
     get_product_by_id,
+    get_products_by_ids,
     update_product,
     delete_product,
 )
-from app.schemas.schemas import ProductCreate, ProductResponse, ProductUpdate
-from app.database.database import get_db
+from app.schemas.schemas import (
+    ProductCreate,
+    SparseProductResponse,
+    ProductResponse,
+    ProductUpdate,
+)
+from app.database.database import get_async_db
+from app.dependencies.db_dependencies import get_read_db
 from fastapi import APIRouter, Depends, Header, Query, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 
 router = APIRouter(prefix="/api/products", tags=["products"])
@@ -18,34 +25,73 @@ router = APIRouter(prefix="/api/products", tags=["products"])
 @router.post("/", response_model=ProductResponse)
 async def create_new_product(
     product_data: ProductCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     authorization: str = Header(None),
 ):
-    return create_product(product_data, db, authorization)
+    return await create_product(product_data, db, authorization)
 
 
 @router.put("/{product_id}", response_model=ProductResponse)
 async def update_existing_product(
     product_id: int,
     product_data: ProductUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     authorization: str = Header(None),
 ):
-    return update_product(product_id, product_data, db, authorization)
+    return await update_product(product_id, product_data, db, authorization)
 
 
 @router.delete("/{product_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_existing_product(
     product_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     authorization: str = Header(None),
 ):
-    return delete_product(product_id, db, authorization)
+    return await delete_product(product_id, db, authorization)
+
+SPARSE_PRODUCT_DESCRIPTION = (
+    "Only the keys named in `fields` (by default every field except `placeholder`) "
+    "plus the relations named in `expand` are present."
+)
+
+
+@router.get(
+    "/",
+    response_model=List[SparseProductResponse],
+    responses={200: {"description": SPARSE_PRODUCT_DESCRIPTION}},
+)
+async def get_products(
+    ids: str = Query(..., description="Comma separated product ids"),
+    include_placeholder: bool = Query(
+        False, description="Embed a tiny base64 preview of each photo"
+    ),
+    fields: Optional[str] = Query(
+        None, description="Comma separated product fields to return"
+    ),
+    expand: Optional[str] = Query(
+        None, description="Comma separated relations to embed: category, supplier"
+    ),
+    db: AsyncSession = Depends(get_read_db),
+):
+    return await get_products_by_ids(ids, db, include_placeholder, fields, expand)
 
-@router.get("/{product_id}", response_model=ProductResponse)
+@router.get(
+    "/{product_id}",
+    response_model=SparseProductResponse,
+    responses={200: {"description": SPARSE_PRODUCT_DESCRIPTION}},
+)
 async def get_product(
     product_id: int,
-    db: Session = Depends(get_db),
+    include_placeholder: bool = Query(
+        False, description="Embed a tiny base64 preview of the photo"
+    ),
+    fields: Optional[str] = Query(
+        None, description="Comma separated product fields to return"
+    ),
+    expand: Optional[str] = Query(
+        None, description="Comma separated relations to embed: category, supplier"
+    ),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    return get_product_by_id(product_id, db)
+    return await get_product_by_id(product_id, db, include_placeholder, fields, expand)
 
@@ -1,6 +1,6 @@
-from fastapi import APIRouter, Depends, UploadFile, File, Response, Header
-from sqlalchemy.orm import Session
-from app.database.database import get_db
+from fastapi import APIRouter, Depends, Request, Header
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database.database import get_async_db
 from app.controllers.profile_controller import (
     upload_user_avatar,
     get_user_avatar,
@@ -9,24 +9,41 @@ from app.controllers.profile_controller import (
 
 router = APIRouter(prefix="/api/profile", tags=["profile"])
 
-@router.post("/avatar/upload")
+# The body is parsed by the controller so the size cap applies while it streams in.
+@router.post(
+    "/avatar/upload",
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "required": ["file"],
+                        "properties": {"file": {"type": "string", "format": "binary"}},
+                    }
+                }
+            },
+        }
+    },
+)
 async def upload_avatar(
-    file: UploadFile = File(...),
-    db: Session = Depends(get_db),
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
     authorization: str = Header(None)
 ):
-    return await upload_user_avatar(file, db, authorization)
+    return await upload_user_avatar(request, db, authorization)
 
 @router.get("/avatar")
 async def fetch_avatar(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     authorization: str = Header(None)
 ):
     return await get_user_avatar(db, authorization)
 
 @router.delete("/avatar")
 async def remove_avatar(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     authorization: str = Header(None)
 ):
     return await delete_user_avatar(db, authorization)
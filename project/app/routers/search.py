@@ -1,7 +1,7 @@
 from typing import Any, Dict, List, Optional
 from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
-from app.database.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.dependencies.db_dependencies import get_read_db
 from app.schemas.schemas import ProductResponse
 from app.controllers.search_controller import search_for_products_controller
 
@@ -30,7 +30,16 @@ async def search_for_products(
     ),
     limit: int = Query(10, description="Number of records to return"),
     offset: int = Query(0, description="Number of records to skip"),
-    db: Session = Depends(get_db),
+    include_placeholder: bool = Query(
+        False, description="Embed a tiny base64 preview of each photo"
+    ),
+    fields: Optional[str] = Query(
+        None, description="Comma separated product fields to return"
+    ),
+    expand: Optional[str] = Query(
+        None, description="Comma separated relations to embed: category, supplier"
+    ),
+    db: AsyncSession = Depends(get_read_db),
 ):
     return await search_for_products_controller(
         product_name=product_name,
@@ -42,5 +51,8 @@ async def search_for_products(
         supplier_name=supplier_name,
         limit=limit,
         offset=offset,
+        include_placeholder=include_placeholder,
+        fields=fields,
+        expand=expand,
         db=db,
     )
@@ -48,6 +48,8 @@ class SupplierResponse(BaseModel):
     name: Optional[str]
     contact_email: Optional[EmailStr]
     phone_number: Optional[str]
+    product_count: int = 0
+    in_stock_count: int = 0
 
     class Config:
         from_attributes = True
@@ -62,6 +64,8 @@ class CategoryResponse(BaseModel):
     id: int
     name: str
     description: Optional[str] = None
+    product_count: int = 0
+    in_stock_count: int = 0
 
     class Config:
         orm_mode = True
@@ -97,10 +101,27 @@ class ProductResponse(BaseModel):
     supplier_id: int
     quantity: int
     photo_path: Optional[str]
+    placeholder: Optional[str] = None
 
     class Config:
         from_attributes = True
         
+
+# Product reads accept fields= and expand=, so every key may be absent from a response.
+class SparseProductResponse(BaseModel):
+    id: Optional[int] = None
+    name: Optional[str] = None
+    description: Optional[str] = None
+    price: Optional[int] = None
+    category_id: Optional[int] = None
+    supplier_id: Optional[int] = None
+    quantity: Optional[int] = None
+    photo_path: Optional[str] = None
+    placeholder: Optional[str] = None
+    category: Optional[CategoryResponse] = None
+    supplier: Optional[SupplierResponse] = None
+
+
 class PaginatedProductResponse(BaseModel):
     products: List[ProductResponse]
     total_products: int
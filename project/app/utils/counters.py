@@ -0,0 +1,84 @@
+from collections import defaultdict
+from typing import Optional, Tuple
+
+from sqlalchemy import case, func, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.reference_cache import category_cache, supplier_cache
+from app.database.tables import Category, Product, Supplier
+
+ProductState = Tuple[int, int, int]
+
+COUNTER_CACHES = {Category: category_cache, Supplier: supplier_cache}
+
+
+def product_state(product: Product) -> ProductState:
+    return product.category_id, product.supplier_id, product.quantity or 0
+
+
+async def apply_product_counter_changes(
+    db: AsyncSession,
+    before: Optional[ProductState] = None,
+    after: Optional[ProductState] = None,
+) -> list:
+    deltas = defaultdict(lambda: [0, 0])
+    for state, sign in ((before, -1), (after, 1)):
+        if state is None:
+            continue
+        category_id, supplier_id, quantity = state
+        in_stock = 1 if quantity > 0 else 0
+        for model, item_id in ((Category, category_id), (Supplier, supplier_id)):
+            deltas[(model, item_id)][0] += sign
+            deltas[(model, item_id)][1] += sign * in_stock
+
+    changed = set()
+    for (model, item_id), (products, in_stock) in deltas.items():
+        if not products and not in_stock:
+            continue
+        await db.execute(
+            update(model)
+            .where(model.id == item_id)
+            .values(
+                product_count=model.product_count + products,
+                in_stock_count=model.in_stock_count + in_stock,
+            )
+        )
+        changed.add(model)
+
+    # Counters are not part of the versioned snapshot, so this doesn't bump the
+    # reference version; callers expire their local counters after committing.
+    return [COUNTER_CACHES[model] for model in changed]
+
+
+def reconcile_product_counters(db: Session) -> int:
+    fixed = 0
+    for model, foreign_key in (
+        (Category, Product.category_id),
+        (Supplier, Product.supplier_id),
+    ):
+        actual = {
+            item_id: (products, in_stock or 0)
+            for item_id, products, in_stock in db.query(
+                foreign_key,
+                func.count(Product.id),
+                func.sum(case((Product.quantity > 0, 1), else_=0)),
+            ).group_by(foreign_key)
+        }
+
+        for item_id, product_count, in_stock_count in db.query(
+            model.id, model.product_count, model.in_stock_count
+        ):
+            expected = actual.get(item_id, (0, 0))
+            if (product_count, in_stock_count) != expected:
+                db.execute(
+                    update(model)
+                    .where(model.id == item_id)
+                    .values(product_count=expected[0], in_stock_count=expected[1])
+                )
+                fixed += 1
+
+    db.commit()
+    for cache in COUNTER_CACHES.values():
+        cache.expire()
+    return fixed
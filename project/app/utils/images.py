@@ -0,0 +1,96 @@
+import base64
+import io
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from PIL import Image, ImageOps
+
+from app.core.static_files import IMAGES_FOLDER, content_hash, write_atomically
+
+PHOTO_SIZES = [(1000, 1000), (500, 500), (100, 100), (10, 10)]
+PLACEHOLDER_SIZE = (10, 10)
+
+AVATAR_SIZE = (256, 256)
+AVATAR_THUMBNAIL_SIZES = [(64, 64)]
+# Larger sources are rejected before decoding rather than relying on Pillow's bomb warning.
+AVATAR_MAX_PIXELS = 40_000_000
+IMAGE_SIGNATURES = {b"\x89PNG\r\n\x1a\n": "PNG", b"\xff\xd8\xff": "JPEG"}
+
+
+def placeholder_data_uri(png_bytes: bytes) -> str:
+    return "data:image/png;base64," + base64.b64encode(png_bytes).decode("ascii")
+
+
+def photo_pyramid_paths(file_name: str, base_folder: Path = IMAGES_FOLDER) -> List[Path]:
+    return [
+        Path(base_folder) / f"{width}x{height}" / f"{file_name}.png"
+        for width, height in PHOTO_SIZES
+    ]
+
+
+def encode_photo_pyramid(img: Image.Image) -> Tuple[List[bytes], str]:
+    levels = []
+    level = img
+    # PHOTO_SIZES is largest first, so each level is resized from the one above it
+    # rather than from the full-size original.
+    for size in PHOTO_SIZES:
+        if level.size != size:
+            level = level.resize(size, Image.Resampling.LANCZOS)
+        levels.append(encode_png(level, optimize=False))
+    return levels, placeholder_data_uri(levels[PHOTO_SIZES.index(PLACEHOLDER_SIZE)])
+
+
+def save_photo_pyramid(
+    img: Image.Image,
+    file_name: str,
+    base_folder: Path = IMAGES_FOLDER,
+    skip_existing: bool = False,
+) -> str:
+    paths = photo_pyramid_paths(file_name, base_folder)
+    if skip_existing and all(path.exists() for path in paths):
+        return placeholder_data_uri(paths[PHOTO_SIZES.index(PLACEHOLDER_SIZE)].read_bytes())
+
+    levels, placeholder = encode_photo_pyramid(img)
+    for path, png_bytes in zip(paths, levels):
+        write_atomically(path, png_bytes)
+    return placeholder
+
+
+def pad_photo(img: Image.Image) -> Image.Image:
+    # Letterboxed rather than stretched, so non-square photos keep their proportions.
+    return ImageOps.pad(img.convert("RGB"), PHOTO_SIZES[0], Image.Resampling.LANCZOS, color="white")
+
+
+def render_product_photo(data: bytes) -> Tuple[str, List[bytes], str]:
+    levels, placeholder = encode_photo_pyramid(pad_photo(Image.open(io.BytesIO(data))))
+    return f"{content_hash(data)}.png", levels, placeholder
+
+
+def sniff_image_format(header: bytes) -> Optional[str]:
+    for signature, image_format in IMAGE_SIGNATURES.items():
+        if header.startswith(signature):
+            return image_format
+    return None
+
+
+def encode_png(img: Image.Image, optimize: bool = True) -> bytes:
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG", optimize=optimize)
+    return buffer.getvalue()
+
+
+def render_avatar(data: bytes) -> List[bytes]:
+    with Image.open(io.BytesIO(data)) as source:
+        if source.format != sniff_image_format(data):
+            raise ValueError(f"unexpected image format {source.format}")
+        if source.width * source.height > AVATAR_MAX_PIXELS:
+            raise ValueError(f"{source.width}x{source.height} image is too large")
+        # Lets the JPEG decoder downscale while decoding instead of materialising the full image.
+        source.draft("RGB", AVATAR_SIZE)
+        img = ImageOps.exif_transpose(source).convert("RGB")
+
+    avatar = ImageOps.fit(img, AVATAR_SIZE, Image.Resampling.LANCZOS)
+    return [encode_png(avatar)] + [
+        encode_png(avatar.resize(size, Image.Resampling.LANCZOS))
+        for size in AVATAR_THUMBNAIL_SIZES
+    ]
@@ -0,0 +1,86 @@
+from typing import List, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.reference_cache import category_cache, supplier_cache
+from app.database.tables import Product
+
+PRODUCT_FIELDS = {
+    "id": Product.id,
+    "name": Product.name,
+    "description": Product.description,
+    "price": Product.price,
+    "category_id": Product.category_id,
+    "supplier_id": Product.supplier_id,
+    "quantity": Product.quantity,
+    "photo_path": Product.photo_path,
+    "placeholder": Product.placeholder,
+}
+DEFAULT_PRODUCT_FIELDS = [name for name in PRODUCT_FIELDS if name != "placeholder"]
+
+EXPANDABLE_RELATIONS = {
+    "category": ("category_id", category_cache),
+    "supplier": ("supplier_id", supplier_cache),
+}
+
+
+def parse_list_param(value: Optional[str], allowed, param: str) -> List[str]:
+    if not value:
+        return []
+    names = []
+    for name in value.split(","):
+        name = name.strip()
+        if not name or name in names:
+            continue
+        if name not in allowed:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown {param} '{name}'. Allowed: {', '.join(allowed)}",
+            )
+        names.append(name)
+    return names
+
+
+def parse_product_fields(
+    fields: Optional[str], include_placeholder: bool = False
+) -> List[str]:
+    selected = parse_list_param(fields, PRODUCT_FIELDS, "field") or list(
+        DEFAULT_PRODUCT_FIELDS
+    )
+    if include_placeholder and "placeholder" not in selected:
+        selected.append("placeholder")
+    return selected
+
+
+def parse_product_expand(expand: Optional[str]) -> List[str]:
+    return parse_list_param(expand, EXPANDABLE_RELATIONS, "expand")
+
+
+def product_columns(fields: List[str], expand: List[str]) -> tuple:
+    names = list(fields)
+    for relation in expand:
+        foreign_key = EXPANDABLE_RELATIONS[relation][0]
+        if foreign_key not in names:
+            names.append(foreign_key)
+    return tuple(PRODUCT_FIELDS[name].label(name) for name in names)
+
+
+async def serialize_products(
+    db: AsyncSession, rows, fields: List[str], expand: List[str]
+) -> List[dict]:
+    payloads = [row._asdict() for row in rows]
+
+    for relation in expand:
+        foreign_key, cache = EXPANDABLE_RELATIONS[relation]
+        related = await cache.lookup_payloads(
+            db, {payload[foreign_key] for payload in payloads}
+        )
+        for payload in payloads:
+            payload[relation] = related.get(payload[foreign_key])
+
+    for payload in payloads:
+        for name in list(payload):
+            if name not in fields and name not in expand:
+                del payload[name]
+    return payloads
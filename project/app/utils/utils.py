@@ -1,9 +1,48 @@
+import asyncio
+import logging
+import os
+import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from fastapi import HTTPException, status
+from app.core.rate_limit import too_many_requests
 from app.database.tables import User
 from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+PASSWORD_HASH_WORKERS = int(
+    os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1)))
+)
+PASSWORD_HASH_MAX_IN_FLIGHT = int(
+    os.getenv("PASSWORD_HASH_MAX_IN_FLIGHT", str(PASSWORD_HASH_WORKERS * 4))
+)
+
+# Niceness of the hashing threads, so a login burst yields the CPU to the event loop.
+PASSWORD_HASH_NICE = int(os.getenv("PASSWORD_HASH_NICE", "10"))
+
+logger = logging.getLogger(__name__)
+
+
+def lower_thread_priority(niceness: int):
+    # Linux schedules threads individually, so this only affects the calling worker.
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), niceness)
+    except (AttributeError, OSError):
+        logger.warning("Could not lower password hashing thread priority", exc_info=True)
+
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+password_hash_executor = ThreadPoolExecutor(
+    max_workers=PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash",
+    initializer=lower_thread_priority,
+    initargs=(PASSWORD_HASH_NICE,),
+)
+in_flight_password_hashes = 0
+# Verified against when an account has no usable password, so failed logins cost the same
+# bcrypt work whether or not the email is registered.
+DUMMY_PASSWORD_HASH = pwd_context.hash(secrets.token_hex(16))
 
 
 def hash_password(password: str) -> str:
@@ -14,17 +53,37 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
-def get_user_by_email(db: Session, email: str) -> User:
-    return db.query(User).filter(User.email == email).first()
+async def run_password_hash(fn, *args):
+    global in_flight_password_hashes
+    if in_flight_password_hashes >= PASSWORD_HASH_MAX_IN_FLIGHT:
+        raise too_many_requests(1)
+
+    in_flight_password_hashes += 1
+    future = asyncio.get_running_loop().run_in_executor(password_hash_executor, fn, *args)
+    # Released when the hash finishes rather than when the caller stops waiting: a
+    # cancelled request leaves its job running in the pool.
+    future.add_done_callback(release_password_hash_slot)
+    return await asyncio.shield(future)
+
+
+def release_password_hash_slot(future: asyncio.Future):
+    global in_flight_password_hashes
+    in_flight_password_hashes -= 1
+    if not future.cancelled():
+        # Retrieved so an abandoned job's error isn't reported as never retrieved.
+        future.exception()
+
+
+async def hash_password_async(password: str) -> str:
+    return await run_password_hash(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await run_password_hash(verify_password, plain_password, hashed_password)
 
 
-def authenticate_user(db: Session, email: str, password: str):
-    user = get_user_by_email(db, email)
-    if not user:
-        return False
-    if not verify_password(password, user.hashed_password):
-        return False
-    return user
+async def get_user_by_email(db: AsyncSession, email: str) -> User:
+    return await db.scalar(select(User).where(User.email == email))
 
 
 def check_admin_privileges(user):
@@ -0,0 +1,74 @@
+import argparse
+import asyncio
+import time
+
+import httpx
+
+
+def percentile(samples, fraction: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def worker(client: httpx.AsyncClient, paths: list, deadline: float, samples: list, errors: list):
+    index = 0
+    while time.perf_counter() < deadline:
+        path = paths[index % len(paths)]
+        index += 1
+        start = time.perf_counter()
+        response = await client.get(path)
+        samples.append((time.perf_counter() - start) * 1000)
+        if response.status_code >= 400:
+            errors.append(response.status_code)
+
+
+async def measure(args, concurrency: int):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60) as client:
+        for path in args.paths:
+            await client.get(path)
+
+        samples, errors = [], []
+        start = time.perf_counter()
+        deadline = start + args.seconds
+        await asyncio.gather(
+            *(worker(client, args.paths, deadline, samples, errors) for _ in range(concurrency))
+        )
+        elapsed = time.perf_counter() - start
+    return len(samples) / elapsed, samples, errors
+
+
+async def run(args):
+    baseline = None
+    print(f"{'in-flight':>9} {'req/s':>9} {'scaling':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for concurrency in args.levels:
+        throughput, samples, errors = await measure(args, concurrency)
+        baseline = baseline or throughput
+        print(
+            f"{concurrency:>9} {throughput:>9.1f} {throughput / baseline:>7.2f}x "
+            f"{percentile(samples, 0.50):>8.1f} {percentile(samples, 0.99):>8.1f} {len(errors):>7}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure read throughput of a running server as in-flight requests grow"
+    )
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument(
+        "--paths",
+        nargs="+",
+        default=["/api/search/products?limit=10", "/api/products/1", "/api/categories/"],
+    )
+    parser.add_argument(
+        "--levels",
+        type=lambda value: [int(level) for level in value.split(",")],
+        default=[1, 2, 4, 8, 16, 32, 64],
+    )
+    parser.add_argument("--seconds", type=float, default=5)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,356 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+BENCH_PASSWORD = "bench-password"
+WORDS = ["red", "blue", "steel", "wood", "smart", "mini", "pro", "eco", "max", "lite"]
+SCENARIOS = ["search", "product_get", "my_orders", "create_order", "login"]
+
+
+def percentile(samples, fraction: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def seed(args):
+    from sqlalchemy import delete, insert, update
+    from sqlalchemy.orm import Session
+
+    from app.core.blobs import utcnow
+    from app.core.reference_cache import bump_version
+    from app.core.security import pwd_context
+    from app.database.database import Base, engine
+    from app.database.tables import (
+        Blob,
+        Category,
+        Order,
+        Product,
+        RefreshToken,
+        RevokedToken,
+        Supplier,
+        User,
+        order_product_table,
+    )
+
+    rng = random.Random(args.seed)
+    Base.metadata.create_all(engine)
+    password_hash = pwd_context.hash(BENCH_PASSWORD)
+
+    products = []
+    product_counts = [0] * args.categories
+    supplier_counts = [0] * args.suppliers
+    for product_id in range(1, args.products + 1):
+        category_index = rng.randrange(args.categories)
+        supplier_index = rng.randrange(args.suppliers)
+        product_counts[category_index] += 1
+        supplier_counts[supplier_index] += 1
+        products.append({
+            "id": product_id,
+            "name": f"{rng.choice(WORDS)} {rng.choice(WORDS)} product {product_id}",
+            "description": "benchmark product " * 5,
+            "price": rng.randint(1, 10_000),
+            "category_id": category_index + 1,
+            "supplier_id": supplier_index + 1,
+            # Large enough that create_order never runs out of stock during a run.
+            "quantity": 1_000_000_000,
+        })
+
+    order_date = datetime(2024, 1, 1)
+    orders, order_lines = [], []
+    for order_id in range(1, args.orders + 1):
+        orders.append({
+            "id": order_id,
+            "user_id": rng.randint(1, args.users),
+            "order_date": order_date + timedelta(minutes=order_id),
+            "status": rng.choice(["Pending", "Shipped", "Delivered"]),
+        })
+        for product_id in rng.sample(range(1, args.products + 1), k=min(3, args.products)):
+            order_lines.append(
+                {"order_id": order_id, "product_id": product_id, "quantity": rng.randint(1, 5)}
+            )
+
+    with engine.begin() as connection:
+        for table in (
+            order_product_table,
+            Order.__table__,
+            RefreshToken.__table__,
+            RevokedToken.__table__,
+            Product.__table__,
+            Category.__table__,
+            Supplier.__table__,
+            User.__table__,
+        ):
+            connection.execute(delete(table))
+        connection.execute(insert(Category), [
+            {
+                "id": index + 1,
+                "name": f"category {index + 1}",
+                "description": "benchmark category",
+                "product_count": count,
+                "in_stock_count": count,
+            }
+            for index, count in enumerate(product_counts)
+        ])
+        connection.execute(insert(Supplier), [
+            {
+                "id": index + 1,
+                "name": f"supplier {index + 1}",
+                "contact_email": f"supplier{index + 1}@bench.example.com",
+                "phone_number": f"+1000{index + 1:07d}",
+                "product_count": count,
+                "in_stock_count": count,
+            }
+            for index, count in enumerate(supplier_counts)
+        ])
+        connection.execute(insert(User), [
+            {
+                "id": user_id,
+                "username": f"bench{user_id}",
+                "email": f"bench{user_id}@bench.example.com",
+                "password_hash": password_hash,
+                "is_admin": False,
+            }
+            for user_id in range(1, args.users + 1)
+        ])
+        connection.execute(insert(Product), products)
+        if orders:
+            connection.execute(insert(Order), orders)
+            connection.execute(insert(order_product_table), order_lines)
+
+        # The seeded rows reference no files, so every tracked blob is now an orphan for the
+        # collector, and a server already running against this database reloads its
+        # categories and suppliers.
+        connection.execute(update(Blob).values(ref_count=0, orphaned_at=utcnow()))
+        with Session(bind=connection) as session:
+            bump_version(session, "categories")
+            bump_version(session, "suppliers")
+            session.flush()
+
+    from app.core.reference_cache import category_cache, supplier_cache
+
+    category_cache.expire()
+    supplier_cache.expire()
+
+
+def make_tokens(args) -> dict:
+    from app.core.security import create_access_token
+
+    return {
+        user_id: create_access_token(
+            {"sub": f"bench{user_id}@bench.example.com", "user_id": user_id, "is_admin": False}
+        )
+        for user_id in range(1, args.users + 1)
+    }
+
+
+def build_request(name: str, rng: random.Random, args, tokens: dict):
+    user_id = rng.randint(1, args.users)
+    if name == "search":
+        return "GET", f"/api/search/products?product_name={rng.choice(WORDS)}&limit=20", None, {}
+    if name == "product_get":
+        return "GET", f"/api/products/{rng.randint(1, args.products)}", None, {}
+    if name == "my_orders":
+        return "GET", "/api/orders/my-orders?limit=10", None, {"Authorization": tokens[user_id]}
+    if name == "create_order":
+        body = {"products": [{"product_id": rng.randint(1, args.products), "quantity": 1}]}
+        return "POST", "/api/orders/", body, {"Authorization": tokens[user_id]}
+    body = {"email": f"bench{user_id}@bench.example.com", "password": BENCH_PASSWORD}
+    return "POST", "/api/auth/login", body, {}
+
+
+async def worker(client, name, index, args, tokens, deadline, samples, errors):
+    rng = random.Random(args.seed * 1000 + index)
+    while time.perf_counter() < deadline:
+        method, path, body, headers = build_request(name, rng, args, tokens)
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, path, json=body, headers=headers)
+            status_code = response.status_code
+        except httpx.HTTPError as e:
+            status_code = type(e).__name__
+        samples.append((time.perf_counter() - start) * 1000)
+        if not isinstance(status_code, int) or status_code >= 400:
+            errors[str(status_code)] = errors.get(str(status_code), 0) + 1
+
+
+async def run_scenario(client, name, args, tokens) -> dict:
+    if args.warmup:
+        await worker(client, name, -1, args, tokens, time.perf_counter() + args.warmup, [], {})
+
+    samples, errors = [], {}
+    start = time.perf_counter()
+    deadline = start + args.seconds
+    await asyncio.gather(*(
+        worker(client, name, index, args, tokens, deadline, samples, errors)
+        for index in range(args.concurrency)
+    ))
+    elapsed = time.perf_counter() - start
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "throughput_rps": round(len(samples) / elapsed, 2),
+        "p50_ms": round(percentile(samples, 0.50), 3),
+        "p95_ms": round(percentile(samples, 0.95), 3),
+        "p99_ms": round(percentile(samples, 0.99), 3),
+        "mean_ms": round(statistics.mean(samples), 3),
+    }
+
+
+def make_client(args) -> httpx.AsyncClient:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    if args.base_url:
+        return httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60)
+
+    from main import app
+
+    return httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60
+    )
+
+
+async def run(args) -> dict:
+    if not args.skip_seed:
+        start = time.perf_counter()
+        seed(args)
+        print(f"seeded in {time.perf_counter() - start:.1f}s")
+
+    tokens = make_tokens(args)
+    results = {}
+    print(f"{'scenario':>13} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    async with make_client(args) as client:
+        for name in args.scenarios:
+            result = results[name] = await run_scenario(client, name, args, tokens)
+            print(
+                f"{name:>13} {result['throughput_rps']:>9.1f} {result['p50_ms']:>8.1f} "
+                f"{result['p95_ms']:>8.1f} {result['p99_ms']:>8.1f} "
+                f"{sum(result['errors'].values()):>7}"
+            )
+
+    from sqlalchemy.engine import make_url
+
+    from app.database.database import SQLALCHEMY_DATABASE_URL, async_engine
+
+    # The in-process app never runs its lifespan, so release its connections here.
+    await async_engine.dispose()
+
+    return {
+        "meta": {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "target": args.base_url or "in-process",
+            "database": make_url(SQLALCHEMY_DATABASE_URL).render_as_string(hide_password=True),
+            "python": platform.python_version(),
+            "concurrency": args.concurrency,
+            "seconds": args.seconds,
+            "seed": args.seed,
+            "dataset": {
+                "users": args.users,
+                "products": args.products,
+                "orders": args.orders,
+                "categories": args.categories,
+                "suppliers": args.suppliers,
+            },
+        },
+        "results": results,
+    }
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> bool:
+    ok = True
+    print(f"{'scenario':>13} {'req/s':>16} {'p95 ms':>16} {'p99 ms':>16}")
+    for name, result in report["results"].items():
+        previous = baseline.get("results", {}).get(name)
+        if previous is None:
+            continue
+        regressed = (
+            result["throughput_rps"] < previous["throughput_rps"] * (1 - tolerance)
+            or result["p95_ms"] > previous["p95_ms"] * (1 + tolerance)
+            or result["p99_ms"] > previous["p99_ms"] * (1 + tolerance)
+        )
+        ok = ok and not regressed
+        print(
+            f"{name:>13} "
+            + " ".join(
+                f"{previous[key]:>7.1f}->{result[key]:<7.1f}"
+                for key in ("throughput_rps", "p95_ms", "p99_ms")
+            )
+            + ("  REGRESSED" if regressed else "")
+        )
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Seed a reproducible dataset and benchmark the main endpoints at fixed concurrency"
+    )
+    parser.add_argument(
+        "--base-url",
+        help="Benchmark a running server; by default the app is driven in-process. "
+        "Either way DATABASE_URL must point at the database the app uses.",
+    )
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--warmup", type=float, default=1)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--orders", type=int, default=20000)
+    parser.add_argument("--categories", type=int, default=20)
+    parser.add_argument("--suppliers", type=int, default=50)
+    parser.add_argument("--skip-seed", action="store_true")
+    parser.add_argument(
+        "--yes-wipe-database",
+        action="store_true",
+        help="Allow seeding the database the app is configured for when DATABASE_URL is unset",
+    )
+    parser.add_argument("--output", default="bench_baseline.json")
+    parser.add_argument("--compare", help="Baseline file to compare against")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.10,
+        help="Allowed relative regression in throughput, p95 and p99 before failing",
+    )
+    args = parser.parse_args()
+
+    # Seeding deletes every user, product and order, so it never falls back to the
+    # configured MySQL server silently.
+    if not args.skip_seed and not os.getenv("DATABASE_URL") and not args.yes_wipe_database:
+        parser.error(
+            "seeding wipes the target database: set DATABASE_URL explicitly "
+            "or pass --yes-wipe-database"
+        )
+
+    if not args.base_url:
+        # The login scenario would otherwise measure the credential rate limiter.
+        for name in ("CREDENTIAL_RATE_PER_IP", "CREDENTIAL_RATE_PER_ACCOUNT"):
+            os.environ.setdefault(name, "1000000")
+        for name in ("CREDENTIAL_BURST_PER_IP", "CREDENTIAL_BURST_PER_ACCOUNT"):
+            os.environ.setdefault(name, "1000000")
+        os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    report = asyncio.run(run(args))
+    Path(args.output).write_text(json.dumps(report, indent=2) + "\n")
+    print(f"wrote {args.output}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        if not compare(report, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
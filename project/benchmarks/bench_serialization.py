@@ -0,0 +1,167 @@
+import argparse
+import asyncio
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.controllers.orders_controller import ORDER_COLUMNS, serialize_orders
+from app.database.database import Base
+from app.database.tables import Order, Product, order_product_table
+from app.schemas.schemas import OrderProductResponse, OrderResponse, ProductResponse
+from app.utils.product_fields import DEFAULT_PRODUCT_FIELDS, product_columns, serialize_products
+
+
+async def seed(engine, rows: int):
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+        await connection.execute(insert(Product), [
+            {
+                "id": i,
+                "name": f"product{i}",
+                "description": "x" * 200,
+                "price": i * 10,
+                "category_id": i % 10 + 1,
+                "supplier_id": i % 50 + 1,
+                "quantity": i % 7,
+                "photo_path": f"{i:064x}.png",
+            }
+            for i in range(1, rows + 3)
+        ])
+        await connection.execute(insert(Order), [
+            {
+                "id": i,
+                "user_id": 1,
+                "order_date": datetime(2024, 10, 19) + timedelta(minutes=i),
+                "status": "pending",
+            }
+            for i in range(1, rows + 1)
+        ])
+        await connection.execute(insert(order_product_table), [
+            {"order_id": i, "product_id": product_id, "quantity": 3}
+            for i in range(1, rows + 1)
+            for product_id in range(i, i + 3)
+        ])
+
+
+# The "before" paths are the pre-orjson controllers: ORM rows validated through
+# the response models and FastAPI's serialize_response.
+async def baseline_search(db: AsyncSession, limit: int, field) -> bytes:
+    products = (await db.scalars(select(Product).limit(limit))).all()
+    content = {
+        "products": [ProductResponse.from_orm(product) for product in products],
+        "total_products": len(products),
+        "total_pages": 1,
+        "current_page": 1,
+        "limit": limit,
+    }
+    return JSONResponse(await serialize_response(field=field, response_content=content)).body
+
+
+async def baseline_orders(db: AsyncSession, limit: int, field) -> bytes:
+    orders = (await db.scalars(select(Order).order_by(Order.id).limit(limit))).all()
+    order_responses = []
+    for order in orders:
+        products_with_quantity = (
+            await db.execute(
+                select(Product, order_product_table.c.quantity)
+                .join(order_product_table, Product.id == order_product_table.c.product_id)
+                .where(order_product_table.c.order_id == order.id)
+            )
+        ).all()
+        order_responses.append(
+            OrderResponse(
+                id=order.id,
+                user_id=order.user_id,
+                order_date=order.order_date.isoformat(),
+                status=order.status,
+                products=[
+                    OrderProductResponse(product_id=product.id, quantity=quantity)
+                    for product, quantity in products_with_quantity
+                ],
+            )
+        )
+    content = {"current_page": 1, "total_pages": 1, "orders": order_responses}
+    return JSONResponse(await serialize_response(field=field, response_content=content)).body
+
+
+# The "after" paths call the serializers the endpoints use today.
+async def current_search(db: AsyncSession, limit: int, field) -> bytes:
+    fields = list(DEFAULT_PRODUCT_FIELDS)
+    rows = (await db.execute(select(*product_columns(fields, [])).limit(limit))).all()
+    return ORJSONResponse({
+        "products": await serialize_products(db, rows, fields, []),
+        "total_products": len(rows),
+        "total_pages": 1,
+        "current_page": 1,
+        "limit": limit,
+    }).body
+
+
+async def current_orders(db: AsyncSession, limit: int, field) -> bytes:
+    rows = (await db.execute(select(*ORDER_COLUMNS).order_by(Order.id).limit(limit))).all()
+    return ORJSONResponse({
+        "current_page": 1,
+        "total_pages": 1,
+        "orders": await serialize_orders(db, rows),
+    }).body
+
+
+async def measure(session_factory, fn, limit: int, field, iterations: int) -> float:
+    async with session_factory() as db:
+        await fn(db, limit, field)
+        start = time.perf_counter()
+        for _ in range(iterations):
+            await fn(db, limit, field)
+            db.expunge_all()
+        return (time.perf_counter() - start) / iterations * 1000
+
+
+async def run(args):
+    engine = create_async_engine(
+        "sqlite+aiosqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False}
+    )
+    await seed(engine, args.rows)
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    field = create_response_field(
+        name="Response_list", type_=Dict[str, Any], mode="serialization"
+    )
+    cases = [
+        ("search", baseline_search, current_search),
+        ("orders", baseline_orders, current_orders),
+    ]
+    try:
+        for name, before, after in cases:
+            before_ms = await measure(session_factory, before, args.rows, field, args.iterations)
+            after_ms = await measure(session_factory, after, args.rows, field, args.iterations)
+            print(
+                f"{name}: before {before_ms:.3f} ms, after {after_ms:.3f} ms, "
+                f"speedup {before_ms / after_ms:.1f}x ({args.rows} rows, query + serialization)"
+            )
+    finally:
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare the Pydantic list responses with the orjson serializers the endpoints use"
+    )
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
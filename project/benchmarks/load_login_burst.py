@@ -0,0 +1,82 @@
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+def percentile(samples, fraction: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def probe(client: httpx.AsyncClient, path: str, stop: asyncio.Event, samples: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get(path)
+        samples.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(0.005)
+
+
+async def login_burst(client: httpx.AsyncClient, email: str, password: str, concurrency: int, total: int):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def login():
+        async with semaphore:
+            await client.post("/api/auth/login", json={"email": email, "password": password})
+
+    await asyncio.gather(*(login() for _ in range(total)))
+
+
+async def measure(client, args, with_burst: bool):
+    samples = []
+    stop = asyncio.Event()
+    probe_task = asyncio.create_task(probe(client, args.probe_path, stop, samples))
+    if with_burst:
+        await login_burst(client, args.email, args.password, args.concurrency, args.logins)
+    else:
+        await asyncio.sleep(args.baseline_seconds)
+    stop.set()
+    await probe_task
+    return samples
+
+
+def report(label: str, samples: list):
+    print(
+        f"{label}: {len(samples)} probes, "
+        f"p50 {percentile(samples, 0.50):.1f} ms, "
+        f"p99 {percentile(samples, 0.99):.1f} ms, "
+        f"max {max(samples):.1f} ms, mean {statistics.mean(samples):.1f} ms"
+    )
+
+
+async def run(args):
+    limits = httpx.Limits(max_connections=args.concurrency + 2)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60) as client:
+        baseline = await measure(client, args, with_burst=False)
+        bursts = [await measure(client, args, with_burst=True) for _ in range(args.repeat)]
+    report("baseline", baseline)
+    for index, burst in enumerate(bursts, 1):
+        report(f"during login burst {index}", burst)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure latency of an unrelated endpoint while /api/auth/login is flooded"
+    )
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--email", default="root@root.root")
+    parser.add_argument("--password", default="root")
+    parser.add_argument("--probe-path", default="/api/categories/")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--baseline-seconds", type=float, default=3)
+    # Tail latency under a burst is noisy, so look at several bursts before drawing conclusions.
+    parser.add_argument("--repeat", type=int, default=3)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
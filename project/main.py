@@ -1,13 +1,58 @@
+import asyncio
 import os
-import time
-from fastapi import FastAPI, Request
+from contextlib import asynccontextmanager
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from starlette.middleware.sessions import SessionMiddleware
 
+from app.core.avatars import shutdown_avatar_workers
+from app.core.blobs import collect_orphaned_blobs_periodically
+from app.core.log import setup_logging
+from app.core.refresh_tokens import sweep_expired_tokens_periodically
+from app.core.revocation import refresh_revocations_periodically
+from app.core.static_files import ImmutableStaticFiles
+from app.database.database import AsyncSessionLocal, async_engine, async_replica_engine
+from app.database.replica import monitor_replica_lag
+from app.middleware.compression import CompressionMiddleware
+from app.middleware.metrics import (
+    METRICS_TOKEN,
+    PrometheusMiddleware,
+    mark_worker_stopped,
+    metrics_app,
+    start_metrics_server,
+)
+from app.middleware.profiling import PROFILING_ENABLED, ProfilingMiddleware
+from app.middleware.sql_timing import SQLTimingMiddleware
 from app.routers import auth, categories, products, suppliers, orders, search, profile
 
-app = FastAPI()
+setup_logging()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    tasks = [
+        asyncio.create_task(refresh_revocations_periodically(AsyncSessionLocal)),
+        asyncio.create_task(sweep_expired_tokens_periodically(AsyncSessionLocal)),
+        asyncio.create_task(collect_orphaned_blobs_periodically(AsyncSessionLocal)),
+    ]
+    if async_replica_engine is not None:
+        tasks.append(asyncio.create_task(monitor_replica_lag(async_replica_engine)))
+    metrics_server = start_metrics_server()
+    yield
+    if metrics_server is not None:
+        await asyncio.to_thread(metrics_server.shutdown)
+        metrics_server.server_close()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    shutdown_avatar_workers()
+    await async_engine.dispose()
+    if async_replica_engine is not None:
+        await async_replica_engine.dispose()
+    mark_worker_stopped()
+
+
+app = FastAPI(lifespan=lifespan)
 from fastapi.openapi.utils import get_openapi
 from dotenv import load_dotenv
 from pathlib import Path
@@ -32,14 +77,11 @@ app.add_middleware(
     secret_key=os.getenv("SESSION_SECRET_KEY", "default_secret"),
 )
 
-@app.middleware("http")
-async def log_time_used(request: Request, call_next):
-    start_time = time.time()
-    response = await call_next(request)
-    duration = time.time() - start_time
-    duration *= 1000
-    print(f"Request to {request.url.path} took {duration:.4f} ms")
-    return response
+app.add_middleware(CompressionMiddleware)
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+app.add_middleware(SQLTimingMiddleware)
+app.add_middleware(PrometheusMiddleware)
 
 directories = [
     "static/avatars",
@@ -61,7 +103,9 @@ app.include_router(products.router)
 app.include_router(orders.router)
 app.include_router(search.router)
 app.include_router(profile.router)
-app.mount("/static", StaticFiles(directory="static"), name="images")
+app.mount("/static", ImmutableStaticFiles(directory="static"), name="images")
+if METRICS_TOKEN:
+    app.mount("/metrics", metrics_app(METRICS_TOKEN), name="metrics")
 
 
 def custom_openapi():
@@ -0,0 +1,55 @@
+"""content hashed photo and avatar paths
+
+Revision ID: 3b9d6e1a7c20
+Revises: f42eb52a2a2b
+Create Date: 2026-10-19 10:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from PIL import Image
+
+from app.core.static_files import IMAGES_FOLDER
+from app.utils.images import pad_photo, save_photo_pyramid
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b9d6e1a7c20'
+down_revision: Union[str, None] = 'f42eb52a2a2b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Uploads used to be a single file referenced as "static/images/<name>.png"; the static
+# mount now serves a size pyramid under static/images/<size>/ referenced by bare name.
+LEGACY_PHOTO_PREFIX = 'static/images/'
+
+products = sa.table('products', sa.column('photo_path', sa.String))
+
+
+def upgrade() -> None:
+    op.drop_constraint('avatar_path', 'users', type_='unique')
+    op.create_index(op.f('ix_users_avatar_path'), 'users', ['avatar_path'], unique=False)
+    op.drop_constraint('photo_path', 'products', type_='unique')
+    op.create_index(op.f('ix_products_photo_path'), 'products', ['photo_path'], unique=False)
+
+    legacy = products.c.photo_path.like(f'{LEGACY_PHOTO_PREFIX}%')
+    for (photo_path,) in op.get_bind().execute(sa.select(products.c.photo_path).where(legacy).distinct()):
+        source = IMAGES_FOLDER / photo_path[len(LEGACY_PHOTO_PREFIX):]
+        if source.exists():
+            with Image.open(source) as img:
+                save_photo_pyramid(pad_photo(img), source.stem, skip_existing=True)
+    op.execute(
+        products.update()
+        .where(legacy)
+        .values(photo_path=sa.func.substr(products.c.photo_path, len(LEGACY_PHOTO_PREFIX) + 1))
+    )
+
+
+def downgrade() -> None:
+    # Photo paths stay in the bare form; the legacy single files are left in place.
+    op.drop_index(op.f('ix_products_photo_path'), table_name='products')
+    op.create_unique_constraint('photo_path', 'products', ['photo_path'])
+    op.drop_index(op.f('ix_users_avatar_path'), table_name='users')
+    op.create_unique_constraint('avatar_path', 'users', ['avatar_path'])
@@ -0,0 +1,36 @@
+"""add product counters to Category and Supplier
+
+Revision ID: 7a2d4b6e8f19
+Revises: c51a7f3e9b84
+Create Date: 2026-10-19 12:31:55.107348
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a2d4b6e8f19'
+down_revision: Union[str, None] = 'c51a7f3e9b84'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    for table, foreign_key in (('categories', 'category_id'), ('suppliers', 'supplier_id')):
+        op.add_column(table, sa.Column('product_count', sa.Integer(), nullable=False, server_default='0'))
+        op.add_column(table, sa.Column('in_stock_count', sa.Integer(), nullable=False, server_default='0'))
+        op.execute(
+            f"UPDATE {table} SET "
+            f"product_count = (SELECT COUNT(*) FROM products WHERE products.{foreign_key} = {table}.id), "
+            f"in_stock_count = (SELECT COUNT(*) FROM products WHERE products.{foreign_key} = {table}.id AND products.quantity > 0)"
+        )
+    op.execute("UPDATE reference_versions SET version = version + 1")
+
+
+def downgrade() -> None:
+    for table in ('suppliers', 'categories'):
+        op.drop_column(table, 'in_stock_count')
+        op.drop_column(table, 'product_count')
@@ -0,0 +1,26 @@
+"""add placeholder to Product
+
+Revision ID: 9e4f2c8b1d53
+Revises: 3b9d6e1a7c20
+Create Date: 2026-10-19 11:02:17.604519
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e4f2c8b1d53'
+down_revision: Union[str, None] = '3b9d6e1a7c20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('products', sa.Column('placeholder', sa.String(length=1000), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('products', 'placeholder')
@@ -0,0 +1,36 @@
+"""sub-second revoked_at
+
+Revision ID: a4c7e2f9d158
+Revises: e6a1c9d4b372
+Create Date: 2026-10-19 18:24:51.604113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4c7e2f9d158'
+down_revision: Union[str, None] = 'e6a1c9d4b372'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # SQLite already keeps microseconds; MySQL's DATETIME rounds to whole seconds.
+    if op.get_bind().dialect.name == 'mysql':
+        op.alter_column('revoked_tokens', 'revoked_at',
+               existing_type=sa.DateTime(),
+               type_=mysql.DATETIME(fsp=6),
+               existing_nullable=False)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'mysql':
+        op.alter_column('revoked_tokens', 'revoked_at',
+               existing_type=mysql.DATETIME(fsp=6),
+               type_=sa.DateTime(),
+               existing_nullable=False)
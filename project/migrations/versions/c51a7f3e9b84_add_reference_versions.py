@@ -0,0 +1,34 @@
+"""add reference_versions
+
+Revision ID: c51a7f3e9b84
+Revises: 9e4f2c8b1d53
+Create Date: 2026-10-19 11:48:03.952671
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c51a7f3e9b84'
+down_revision: Union[str, None] = '9e4f2c8b1d53'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    reference_versions = op.create_table('reference_versions',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.bulk_insert(reference_versions, [
+        {'name': 'categories', 'version': 0},
+        {'name': 'suppliers', 'version': 0},
+    ])
+
+
+def downgrade() -> None:
+    op.drop_table('reference_versions')
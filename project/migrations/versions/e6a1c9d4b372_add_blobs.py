@@ -0,0 +1,45 @@
+"""add blobs
+
+Revision ID: e6a1c9d4b372
+Revises: 5b7e2d9c4a18
+Create Date: 2026-10-19 16:52:08.218734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6a1c9d4b372'
+down_revision: Union[str, None] = '5b7e2d9c4a18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('blobs',
+    sa.Column('name', sa.String(length=200), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('ref_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('orphaned_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.create_index(op.f('ix_blobs_orphaned_at'), 'blobs', ['orphaned_at'], unique=False)
+    op.execute(
+        "INSERT INTO blobs (name, kind, ref_count, created_at) "
+        "SELECT avatar_path, 'avatar', COUNT(*), CURRENT_TIMESTAMP FROM users "
+        "WHERE avatar_path IS NOT NULL GROUP BY avatar_path"
+    )
+    op.execute(
+        "INSERT INTO blobs (name, kind, ref_count, created_at) "
+        "SELECT photo_path, 'photo', COUNT(*), CURRENT_TIMESTAMP FROM products "
+        "WHERE photo_path IS NOT NULL GROUP BY photo_path"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_blobs_orphaned_at'), table_name='blobs')
+    op.drop_table('blobs')
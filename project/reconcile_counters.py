@@ -0,0 +1,18 @@
+from app.core.blobs import reconcile_blob_references
+from app.database.database import SessionLocal
+from app.utils.counters import reconcile_product_counters
+
+
+def reconcile():
+    db = SessionLocal()
+    try:
+        fixed = reconcile_product_counters(db)
+        blobs_fixed = reconcile_blob_references(db)
+    finally:
+        db.close()
+    print(f"Reconciled product counters, {fixed} rows corrected.")
+    print(f"Reconciled blob references, {blobs_fixed} rows corrected.")
+
+
+if __name__ == "__main__":
+    reconcile()
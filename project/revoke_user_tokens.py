@@ -0,0 +1,19 @@
+import asyncio
+import sys
+from datetime import timedelta
+
+from app.core.refresh_tokens import revoke_user_refresh_tokens
+from app.core.revocation import revoke_user_tokens
+from app.core.security import REFRESH_TOKEN_EXPIRE_DAYS
+from app.database.database import AsyncSessionLocal
+
+
+async def revoke(user_id: int):
+    async with AsyncSessionLocal() as db:
+        await revoke_user_tokens(db, user_id, timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS))
+        await revoke_user_refresh_tokens(db, user_id)
+    print(f"Revoked all tokens issued to user {user_id}.")
+
+
+if __name__ == "__main__":
+    asyncio.run(revoke(int(sys.argv[1])))
@@ -1,8 +1,9 @@
+import argparse
 import asyncio
 import os
 import shutil
 import time
-from sqlalchemy import text
+from sqlalchemy import select, text
 from sqlalchemy.orm import Session
 from fastapi import Depends
 from app.database.database import get_db
@@ -10,6 +11,7 @@ from app.database.seeders.categories import seed_categories
 from app.database.seeders.suppliers import seed_suppliers
 from app.database.seeders.products import seed_products
 from app.database.seeders.orders import seed_orders
+from app.database.seeders.parallel import SEED_CHUNK_SIZE, SEED_WORKERS
 from app.database.tables import (
     Category,
     Supplier,
@@ -17,10 +19,13 @@ from app.database.tables import (
     Order,
     User,
 )
-from app.database.database import SessionLocal
+from app.database.database import AsyncSessionLocal, SessionLocal
 from app.database.database import engine, Base, root_engine
 from app.schemas.schemas import UserCreate
 from app.controllers.auth_controller import register_new_user
+from app.core.reference_cache import bump_version
+from app.utils.counters import reconcile_product_counters
+from app.core.blobs import reconcile_blob_references
 
 
 def create_tables():
@@ -29,24 +34,25 @@ def create_tables():
     print("Tables created successfully.")
 
 
-def create_main_user():
+async def create_main_user():
     user = UserCreate(username="root", email="root@root.root", password="root")
-    db = SessionLocal()
-    
-    existing_user = db.query(User).filter(User.username == user.username).first()
-    
-    if existing_user is None:
-        register_new_user(user, db)
-        print("Main user created.")
-    else:
-        print("Main user already exists.")
+    async with AsyncSessionLocal() as db:
+        existing_user = await db.scalar(
+            select(User).where(User.username == user.username)
+        )
 
-    db.close()
+        if existing_user is None:
+            await register_new_user(user, db)
+            print("Main user created.")
+        else:
+            print("Main user already exists.")
 
 
-async def clear_db_img(db: Session):
+async def clear_db_img(db: Session, keep_images: bool = False):
     images_folder = "static/images"
-    if os.path.exists(images_folder):
+    if keep_images:
+        print(f"Keeping {images_folder}; existing photos will be reused.")
+    elif os.path.exists(images_folder):
         shutil.rmtree(images_folder)
         print(f"Folder {images_folder} deleted.")
     else:
@@ -57,26 +63,64 @@ async def clear_db_img(db: Session):
     db.query(Product).delete()
     db.query(Category).delete()
     db.query(Supplier).delete()
+    bump_version(db, "categories")
+    bump_version(db, "suppliers")
     db.commit()
     print("Database cleared")
 
-async def seed():
+async def seed(args):
     start_time = time.time()
     db = SessionLocal()
     try:
-        await clear_db_img(db)
-        await seed_suppliers(db, 50)
-        await seed_categories(db, 10)
-        await seed_products(db, 100)
-        #await seed_orders(db, 50)
+        await clear_db_img(db, args.keep_images)
+        await seed_suppliers(db, args.suppliers)
+        await seed_categories(db, args.categories)
+        seed_products(
+            args.products,
+            photo_pool_size=args.photos,
+            workers=args.workers,
+            chunk_size=args.chunk_size,
+            seed=args.seed,
+        )
+        if args.orders:
+            seed_orders(
+                args.orders,
+                workers=args.workers,
+                chunk_size=args.chunk_size,
+                seed=args.seed,
+            )
+        reconcile_product_counters(db)
+        reconcile_blob_references(db)
     finally:
         db.close()
 
     elapsed_time = time.time() - start_time
-    print(f"Seeding completed in {elapsed_time:.2f} seconds")
+    rows = args.products + args.orders
+    print(
+        f"Seeding completed in {elapsed_time:.2f} seconds "
+        f"({rows / elapsed_time:,.0f} products and orders per second)"
+    )
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Clear and reseed the catalogue")
+    parser.add_argument("--suppliers", type=int, default=50)
+    parser.add_argument("--categories", type=int, default=10)
+    parser.add_argument("--products", type=int, default=100)
+    parser.add_argument("--orders", type=int, default=0)
+    parser.add_argument(
+        "--photos", type=int, default=100, help="Distinct product photos to render and share"
+    )
+    parser.add_argument(
+        "--keep-images",
+        action="store_true",
+        help="Don't wipe static/images, so photos rendered by an earlier run with the same seed are skipped",
+    )
+    parser.add_argument("--workers", type=int, default=SEED_WORKERS)
+    parser.add_argument("--chunk-size", type=int, default=SEED_CHUNK_SIZE)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
     create_tables()
-    #create_main_user()
-    asyncio.run(seed())
+    #asyncio.run(create_main_user())
+    asyncio.run(seed(args))
@@ -0,0 +1,13 @@
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# One database for every test module in the run; removed when the interpreter exits.
+TEMP_DIR = tempfile.mkdtemp()
+atexit.register(shutil.rmtree, TEMP_DIR, ignore_errors=True)
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{TEMP_DIR}/test.db")
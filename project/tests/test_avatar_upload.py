@@ -0,0 +1,128 @@
+import io
+import multiprocessing
+import os
+import tempfile
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from unittest import mock
+
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from support import TEMP_DIR
+
+import app.core.avatars as avatars
+import app.core.blobs as blobs
+from app.controllers import profile_controller
+from app.core.security import create_access_token
+from app.database.database import Base, SessionLocal, engine
+from app.database.tables import User
+from main import app
+
+MAX_BYTES = 1024
+BOUNDARY = "avatarboundary"
+
+
+def png_bytes(color: str) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (32, 32), color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def multipart(data: bytes) -> bytes:
+    return (
+        f"--{BOUNDARY}\r\n"
+        'Content-Disposition: form-data; name="file"; filename="avatar.png"\r\n'
+        "Content-Type: image/png\r\n\r\n"
+    ).encode() + data + f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+def broken_pool() -> ProcessPoolExecutor:
+    pool = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+    try:
+        pool.submit(os._exit, 1).result()
+    except BrokenProcessPool:
+        pass
+    return pool
+
+
+class AvatarUploadTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        Base.metadata.create_all(engine)
+        with SessionLocal() as db:
+            user = User(username="uploader", email="uploader@example.com")
+            db.add(user)
+            db.commit()
+            cls.token = create_access_token({"sub": user.email, "user_id": user.id})
+        cls.client = TestClient(app)
+
+    @classmethod
+    def tearDownClass(cls):
+        avatars.shutdown_avatar_workers()
+
+    def setUp(self):
+        patches = [
+            mock.patch.object(profile_controller, "AVATAR_MAX_BYTES", MAX_BYTES),
+            mock.patch.object(blobs, "AVATAR_FOLDER", Path(tempfile.mkdtemp(dir=TEMP_DIR))),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def upload(self, content, headers=None):
+        return self.client.post(
+            "/api/profile/avatar/upload",
+            content=content,
+            headers={
+                "Authorization": self.token,
+                "Content-Type": f"multipart/form-data; boundary={BOUNDARY}",
+                **(headers or {}),
+            },
+        )
+
+    def test_uploads_avatar(self):
+        response = self.upload(multipart(png_bytes("green")))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue((blobs.AVATAR_FOLDER / response.json()["avatar_url"]).exists())
+
+    def test_rejects_declared_oversize_body(self):
+        max_body_bytes = MAX_BYTES + profile_controller.MULTIPART_OVERHEAD_BYTES
+        response = self.upload(b"", headers={"Content-Length": str(max_body_bytes + 1)})
+        self.assertEqual(response.status_code, 413)
+
+    def test_rejects_oversize_chunked_body(self):
+        body = multipart(b"0" * (MAX_BYTES + profile_controller.MULTIPART_OVERHEAD_BYTES))
+
+        def chunks():
+            for offset in range(0, len(body), 4096):
+                yield body[offset:offset + 4096]
+
+        response = self.upload(chunks())
+        self.assertEqual(response.status_code, 413)
+
+    def test_rejects_oversize_file_in_small_body(self):
+        response = self.upload(multipart(b"\x89PNG\r\n\x1a\n" + b"0" * MAX_BYTES))
+        self.assertEqual(response.status_code, 413)
+
+    def test_rejects_unknown_magic_bytes(self):
+        response = self.upload(multipart(b"GIF89a" + b"0" * 64))
+        self.assertEqual(response.status_code, 400)
+
+    def test_replaces_broken_worker_pool(self):
+        avatars.shutdown_avatar_workers()
+        pool = avatars.executor = broken_pool()
+        response = self.upload(multipart(png_bytes("blue")))
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNot(avatars.executor, pool)
+
+    def test_reports_unavailable_when_workers_keep_failing(self):
+        with mock.patch.object(avatars, "get_executor", broken_pool):
+            response = self.upload(multipart(png_bytes("red")))
+        self.assertEqual(response.status_code, 503)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,174 @@
+import io
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest import mock
+
+import httpx
+from PIL import Image
+
+from support import TEMP_DIR
+
+import app.core.blobs as blobs
+from app.controllers import auth_controller
+from app.controllers.auth_controller import AvatarTooLarge, attach_google_avatar, download_avatar
+from app.core.avatars import InvalidAvatar, shutdown_avatar_workers
+from app.database.database import AsyncSessionLocal, Base, async_engine, engine
+from app.database.tables import Blob, User
+
+MAX_BYTES = 1024
+TIMEOUT_SECONDS = 0.3
+
+
+def png_bytes() -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (32, 32), "red").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class StandInAvatarHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/avatar.png":
+            self.send_body(png_bytes())
+        elif self.path == "/declared-too-large.png":
+            self.send_body(b"\x89PNG" + b"0" * 60, content_length=MAX_BYTES + 1)
+        elif self.path == "/streamed-too-large.png":
+            # No Content-Length, so the cap has to be enforced while streaming.
+            self.send_response(200)
+            self.send_header("Content-Type", "image/png")
+            self.end_headers()
+            for _ in range(4):
+                self.wfile.write(b"0" * MAX_BYTES)
+        elif self.path == "/stalled.png":
+            time.sleep(TIMEOUT_SECONDS * 3)
+            self.send_body(png_bytes())
+        elif self.path == "/trickle.png":
+            # Every read completes within the per-read timeout, but the body never finishes in time.
+            self.send_response(200)
+            self.send_header("Content-Type", "image/png")
+            self.send_header("Content-Length", str(MAX_BYTES))
+            self.end_headers()
+            try:
+                for _ in range(MAX_BYTES):
+                    self.wfile.write(b"0")
+                    self.wfile.flush()
+                    time.sleep(TIMEOUT_SECONDS / 3)
+            except ConnectionError:
+                pass
+        elif self.path == "/page.html":
+            self.send_body(b"<html></html>", content_type="text/html")
+        else:
+            self.send_error(404)
+
+    def send_body(self, body: bytes, content_type: str = "image/png", content_length=None):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(content_length or len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except ConnectionError:
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+class GoogleAvatarDownloadTests(unittest.IsolatedAsyncioTestCase):
+    @classmethod
+    def setUpClass(cls):
+        Base.metadata.create_all(engine)
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StandInAvatarHandler)
+        cls.server.daemon_threads = True
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        shutdown_avatar_workers()
+
+    async def asyncSetUp(self):
+        self.avatar_folder = Path(tempfile.mkdtemp(dir=TEMP_DIR))
+        patches = [
+            mock.patch.object(auth_controller, "GOOGLE_AVATAR_MAX_BYTES", MAX_BYTES),
+            mock.patch.object(auth_controller, "GOOGLE_AVATAR_TIMEOUT_SECONDS", TIMEOUT_SECONDS),
+            mock.patch.object(blobs, "AVATAR_FOLDER", self.avatar_folder),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+        async with AsyncSessionLocal() as db:
+            user = User(username=f"google{id(self)}", email=f"google{id(self)}@example.com")
+            db.add(user)
+            await db.commit()
+            self.user_id = user.id
+
+    async def asyncTearDown(self):
+        await async_engine.dispose()
+
+    async def download(self, path: str) -> bytes:
+        buffer = io.BytesIO()
+        await download_avatar(self.base_url + path, buffer)
+        return buffer.read()
+
+    async def stored_avatar(self):
+        async with AsyncSessionLocal() as db:
+            return (await db.get(User, self.user_id)).avatar_path
+
+    async def test_downloads_image(self):
+        self.assertEqual(await self.download("/avatar.png"), png_bytes())
+
+    async def test_rejects_declared_oversize_body(self):
+        with self.assertRaises(AvatarTooLarge):
+            await self.download("/declared-too-large.png")
+
+    async def test_rejects_streamed_oversize_body(self):
+        with self.assertRaises(AvatarTooLarge):
+            await self.download("/streamed-too-large.png")
+
+    async def test_times_out_on_stalled_server(self):
+        start = time.perf_counter()
+        with self.assertRaises((TimeoutError, httpx.TimeoutException)):
+            await self.download("/stalled.png")
+        self.assertLess(time.perf_counter() - start, TIMEOUT_SECONDS * 3)
+
+    async def test_times_out_on_trickling_body(self):
+        start = time.perf_counter()
+        with self.assertRaises(TimeoutError):
+            await self.download("/trickle.png")
+        self.assertLess(time.perf_counter() - start, TIMEOUT_SECONDS * 3)
+
+    async def test_rejects_non_image_content_type(self):
+        with self.assertRaises(InvalidAvatar):
+            await self.download("/page.html")
+
+    async def test_attaches_downloaded_avatar(self):
+        await attach_google_avatar(self.user_id, self.base_url + "/avatar.png")
+        avatar = await self.stored_avatar()
+        self.assertIsNotNone(avatar)
+        self.assertTrue((self.avatar_folder / avatar).exists())
+        async with AsyncSessionLocal() as db:
+            self.assertEqual((await db.get(Blob, avatar)).ref_count, 1)
+
+    async def test_failed_download_leaves_user_without_avatar(self):
+        for path in (
+            "/declared-too-large.png",
+            "/streamed-too-large.png",
+            "/stalled.png",
+            "/trickle.png",
+            "/page.html",
+        ):
+            with self.subTest(path=path), self.assertLogs(auth_controller.logger, "WARNING"):
+                await attach_google_avatar(self.user_id, self.base_url + path)
+                self.assertIsNone(await self.stored_avatar())
+        self.assertEqual(list(self.avatar_folder.iterdir()), [])
+
+
+if __name__ == "__main__":
+    unittest.main()